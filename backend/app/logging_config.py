@@ -0,0 +1,125 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time as time_lib
+
+ROOT_LOGGER = 'algo'
+
+_listener = None
+
+
+def get_logger(category):
+    """Logger for a category such as 'ticks', 'orders' or 'signals'"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{category}")
+
+
+def parse_category_map(value):
+    """Parse 'ticks=WARNING,orders=DEBUG' into a dict"""
+    result = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            category, setting = item.split('=', 1)
+            result[category.strip()] = setting.strip()
+    return result
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, category, message and structured fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'category': record.name[len(ROOT_LOGGER) + 1:] if record.name.startswith(ROOT_LOGGER + '.') else record.name,
+            'msg': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most `rate` records per second through and counts the rest"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_allowed = 0.0
+        self.suppressed = 0
+
+    def filter(self, record):
+        now = time_lib.monotonic()
+        if now < self.next_allowed:
+            self.suppressed += 1
+            return False
+        self.next_allowed = now + self.interval
+        if self.suppressed:
+            # The next record that gets through reports how many were sampled away
+            record.suppressed = self.suppressed
+            self.suppressed = 0
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread; drops instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread, keep the event loop's share minimal
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging():
+    """Route all 'algo.*' loggers through a queue drained by a background thread
+
+    LOG_LEVEL sets the default level, LOG_LEVELS overrides it per category
+    (e.g. "ticks=WARNING,orders=DEBUG") and LOG_RATE_LIMITS caps records per
+    second for high-frequency categories (e.g. "ticks=1").
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    root.addHandler(NonBlockingQueueHandler(log_queue))
+    root.propagate = False
+
+    for category, level in parse_category_map(os.getenv('LOG_LEVELS', '')).items():
+        get_logger(category).setLevel(level.upper())
+    for category, rate in parse_category_map(os.getenv('LOG_RATE_LIMITS', 'ticks=1')).items():
+        get_logger(category).addFilter(RateLimitFilter(float(rate)))
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
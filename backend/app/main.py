@@ -1,19 +1,35 @@
-from fastapi import FastAPI, WebSocket, HTTPException, WebSocketDisconnect, status
+from fastapi import FastAPI, WebSocket, HTTPException, WebSocketDisconnect, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime, time
 import json
-import pytz
+from .logging_config import setup_logging, shutdown_logging, get_logger
+from .metrics import REGISTRY, SIGNALS, SIGNAL_REJECTS
 from .trading.ib_handler import IBHandler
+from .trading import market_calendar
+from .trading.broker import create_brokers
+from .trading.connection_pool import parse_endpoints
+from .trading.signal_queue import SignalQueue, QueueFull
+from .trading.retention import Retention
+from .trading.journal import Journal, KINDS as JOURNAL_KINDS
+from .trading.tick_store import TickStore, BAR_INTERVALS, BAR_FIELDS
 from .models.settings import Settings
+from .models.state import clean_float
+from .serialization import ResponseCache, dumps
+from .streaming.hub import BroadcastHub
+from .streaming.notifier import ChangeNotifier
+from .streaming.protocol import PROTOCOL_VERSION, negotiate_encoding, decode, encode
 import asyncio
 from fastapi import BackgroundTasks
 import os
 from pathlib import Path
-from zoneinfo import ZoneInfo
-import math
 from starlette.websockets import WebSocketState
 import time as time_lib
 from pydantic import BaseModel
+from typing import List
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+# Log records are written by a background thread, never on the event loop
+setup_logging()
+log = get_logger('api')
 
 app = FastAPI()
 
@@ -46,146 +62,329 @@ if not SETTINGS_PATH.exists():
 with open(SETTINGS_PATH, "r") as f:
     settings = Settings(**json.load(f))
 
+# IB callbacks report state changes here, pushed to clients after the debounce window
+notifier = ChangeNotifier(debounce=float(os.getenv("WS_DEBOUNCE_MS", "50")) / 1000)
+
+# BROKER_BACKEND=sim runs against the in-process simulator instead of a gateway
+order_broker, data_broker = create_brokers(os.getenv("BROKER_BACKEND", "ib"))
+
+# Signals, order transitions, fills, positions and PnL, kept across restarts; JOURNAL_PATH="" disables it
+JOURNAL_PATH = os.getenv("JOURNAL_PATH", str(BASE_DIR / "journal.db"))
+journal = Journal(
+    JOURNAL_PATH,
+    batch_size=int(os.getenv("JOURNAL_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("JOURNAL_FLUSH_MS", "250")) / 1000
+) if JOURNAL_PATH else None
+
 # Initialize IB Handler with settings
-ib_handler = IBHandler(settings)
+ib_handler = IBHandler(
+    settings,
+    notifier=notifier,
+    ack_timeout=float(os.getenv("ORDER_ACK_TIMEOUT", "5")),
+    reconcile_interval=float(os.getenv("RECONCILE_INTERVAL", "30")),
+    square_off_timeout=float(os.getenv("SQUARE_OFF_TIMEOUT", "30")),
+    # Separate clients for order entry and market data
+    broker=order_broker,
+    data_broker=data_broker,
+    # Tried in order, e.g. TWS_ENDPOINTS=ib-gateway:4001,127.0.0.1:7497
+    endpoints=parse_endpoints(os.getenv(
+        "TWS_ENDPOINTS", f"{os.getenv('TWS_HOST', 'ib-gateway')}:{os.getenv('TWS_PORT', '4001')}"
+    )),
+    # Order entry keeps its own client ID, market data uses TWS_DATA_CLIENT_ID (default: next one)
+    client_id=int(os.getenv("TWS_CLIENT_ID", "1")),
+    data_client_id=int(os.environ["TWS_DATA_CLIENT_ID"]) if os.getenv("TWS_DATA_CLIENT_ID") else None,
+    health_interval=float(os.getenv("IB_HEALTH_INTERVAL", "10")),
+    # Reconnect delays double from IB_BACKOFF_INITIAL up to IB_BACKOFF_MAX seconds, jittered
+    backoff_initial=float(os.getenv("IB_BACKOFF_INITIAL", "1")),
+    backoff_max=float(os.getenv("IB_BACKOFF_MAX", "60")),
+    # IB accounts start with 100 simultaneous market data lines
+    market_data_lines=int(os.getenv("MARKET_DATA_LINES", "100")),
+    # Days before expiry the MES front month rolls to the next quarter
+    mes_roll_days=int(os.getenv("MES_ROLL_DAYS", "8")),
+    # Minimum time between runs of each tick consumer; ticks in between are conflated.
+    # Bar volume stays exact either way, but with TICK_BARS_INTERVAL_MS > 0 bar high/low
+    # can miss trades that happen between two runs of the bars consumer.
+    tick_intervals={
+        "price": float(os.getenv("TICK_PRICE_INTERVAL_MS", "0")) / 1000,
+        "bars": float(os.getenv("TICK_BARS_INTERVAL_MS", "0")) / 1000
+    },
+    # Fixed memory per symbol: TICK_BUFFER_SIZE ticks plus BAR_BUFFER_SIZE bars per interval
+    tick_store=TickStore(
+        tick_capacity=int(os.getenv("TICK_BUFFER_SIZE", "10000")),
+        bar_capacity=int(os.getenv("BAR_BUFFER_SIZE", "2000"))
+    ),
+    journal=journal
+)
+
+# Webhook signals are acknowledged at once and placed by a pool of workers
+signal_queue = SignalQueue(
+    lambda signal, received_at: ib_handler.process_signal(signal, received_at=received_at),
+    max_queue=int(os.getenv("SIGNAL_QUEUE_SIZE", "100")),
+    workers=int(os.getenv("SIGNAL_WORKERS", "4")),
+    dedup_ttl=float(os.getenv("SIGNAL_DEDUP_TTL", "10")),
+    dedup_size=int(os.getenv("SIGNAL_DEDUP_SIZE", "1024"))
+)
+
+# Finished orders and old fills are archived and dropped so memory stays flat across days
+retention = Retention(
+    ib_handler,
+    order_ttl=float(os.getenv("ORDER_RETENTION_SECONDS", "3600")),
+    closed_order_ttl=float(os.getenv("CLOSED_ORDER_TTL", "300")),
+    max_orders=int(os.getenv("MAX_ORDER_HISTORY", "1000")),
+    fill_ttl=float(os.getenv("FILL_RETENTION_SECONDS", "86400")),
+    max_fills=int(os.getenv("MAX_FILL_HISTORY", "5000")),
+    # Set ARCHIVE_DIR to an empty string to drop aged-out records without archiving them
+    archive_dir=os.getenv("ARCHIVE_DIR", str(BASE_DIR / "archive")),
+    interval=float(os.getenv("RETENTION_INTERVAL", "60"))
+)
+
+# Encoded REST bodies, rebuilt only when the state version moves
+responses = ResponseCache()
 
 # Track active WebSocket connections
 active_connections = set()
 
-async def send_heartbeat(websocket: WebSocket):
-    """Send periodic heartbeat to keep connection alive"""
-    while True:
-        try:
-            if websocket.client_state == WebSocketState.CONNECTED:
-                await websocket.send_json({"type": "heartbeat", "timestamp": time_lib.time()})
-            await asyncio.sleep(30)  # Send heartbeat every 30 seconds
-        except Exception as e:
-            print(f"Heartbeat error: {e}")
-            break
+async def build_snapshot():
+    """Collect the state pushed to every WebSocket client"""
+    return {
+        "positions": await ib_handler.get_positions(),
+        "orders": await ib_handler.get_orders(),
+        "pnl": await ib_handler.get_pnl(),
+        # Stays stale with the last known state while IB is disconnected
+        "connection": ib_handler.connection_state()
+    }
 
-async def send_data_updates(websocket: WebSocket):
-    """Send periodic data updates to client"""
-    while True:
-        try:
-            if websocket.client_state == WebSocketState.CONNECTED:
-                positions = await ib_handler.get_positions()
-                orders = await ib_handler.get_orders()
-                pnl = await ib_handler.get_pnl()
-
-                message = {
-                    "type": "data",
-                    "timestamp": time_lib.time(),
-                    "data": {
-                        "positions": positions,
-                        "orders": orders,
-                        "pnl": pnl
-                    }
-                }
-
-                await websocket.send_json(message)
-            await asyncio.sleep(1)  # Send updates every second
-        except Exception as e:
-            print(f"Data update error: {e}")
-            break
+def stale_headers():
+    """Flag REST responses served from last-known state while IB is disconnected"""
+    state = ib_handler.connection_state()
+    if not state["stale"]:
+        return None
+    return {"X-State-Stale": "true", "X-State-Stale-Since": str(state["since"])}
+
+# One shared producer fans the same encoded frame out to every client
+hub = BroadcastHub(
+    build_snapshot,
+    notifier,
+    keepalive=float(os.getenv("WS_KEEPALIVE", "30")),
+    max_queue=int(os.getenv("WS_CLIENT_QUEUE_SIZE", "8"))
+)
 
 @app.on_event("startup")
 async def startup_event():
+    # Start the journal writer before the first IB events arrive
+    if journal:
+        journal.start()
     await ib_handler.connect()
     # Start auto square-off task
     asyncio.create_task(ib_handler.auto_square_off_task())
+    # Re-warm the contract cache at each market open
+    asyncio.create_task(ib_handler.contract_cache_task())
+    # Start the shared WebSocket snapshot producer
+    asyncio.create_task(hub.run())
+    # Periodically reconcile local state with IB
+    asyncio.create_task(ib_handler.reconciler.run())
+    # Health-check both IB clients, reconnecting and restoring state when one drops
+    asyncio.create_task(ib_handler.pool.run())
+    # Start the signal workers
+    signal_queue.start()
+    # Age out finished orders and old fills
+    asyncio.create_task(retention.run())
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Gracefully close all WebSocket connections and cleanup IB connection"""
+    signal_queue.stop()
+
     # First close all WebSocket connections
     for websocket in active_connections.copy():
         try:
+            hub.remove(websocket)
             await websocket.close(code=status.WS_1001_GOING_AWAY)
         except Exception as e:
-            print(f"Error closing WebSocket during shutdown: {e}")
+            log.error(f"Error closing WebSocket during shutdown: {e}")
     active_connections.clear()
     
     # Then disconnect from IB
     try:
         await ib_handler.disconnect()
     except Exception as e:
-        print(f"Error disconnecting from IB during shutdown: {e}")
+        log.error(f"Error disconnecting from IB during shutdown: {e}")
+
+    # Write out queued journal entries
+    if journal:
+        journal.stop()
 
+    # Flush any queued log records
+    shutdown_logging()
 @app.post("/api/signal")
-async def handle_signal(signal: dict):
+async def handle_signal(signal: dict, request: Request, wait: float = 0):
+    """Queue a signal and return 202 with its job ID
+
+    Poll /api/signal/{jobId}, pass callback_url in the body to have the result
+    POSTed back, or ?wait=seconds to hold the request until it is done.
+    """
+    received_at = time_lib.perf_counter()
+    SIGNALS.inc()
     if not settings.trading_enabled:
+        SIGNAL_REJECTS.inc()
         return {"status": "error", "message": "Trading is disabled"}
     
-    # Check if it's past 3:55 PM EST
-    est = ZoneInfo('America/New_York')  # Using IANA timezone name instead of US/Eastern
-    current_time = datetime.now(est).time()
-    cutoff_time = time(15, 55)
-    
-    if current_time >= cutoff_time:
+    # Check if it's past the square-off cutoff (3:55 PM EST, 12:55 PM on early-close days)
+    if market_calendar.past_cutoff():
+        SIGNAL_REJECTS.inc()
         return {"status": "error", "message": "Trading hours ended"}
     
-    return await ib_handler.process_signal(signal)
+    callback_url = signal.pop("callback_url", None)
+    try:
+        job, duplicate = signal_queue.submit(signal, received_at,
+                                             idempotency_key=request.headers.get("idempotency-key"),
+                                             callback_url=callback_url)
+    except QueueFull as e:
+        SIGNAL_REJECTS.inc()
+        return JSONResponse(status_code=429, headers={"Retry-After": str(e.retry_after)},
+                            content={"status": "error", "message": str(e)})
+    except ValueError as e:
+        SIGNAL_REJECTS.inc()
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+
+    if wait > 0:
+        try:
+            await asyncio.wait_for(asyncio.shield(job.done.wait()), wait)
+        except asyncio.TimeoutError:
+            pass
+    return JSONResponse(status_code=200 if job.status == "done" else 202,
+                        content={**job.to_dict(), "duplicate": duplicate})
+
+@app.get("/api/signal/{job_id}")
+async def get_signal(job_id: str):
+    job = signal_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired signal job")
+    return job.to_dict()
+
+@app.get("/api/signals/queue")
+async def get_signal_queue():
+    return signal_queue.status()
+
+SIGNAL_BATCH_MAX = int(os.getenv("SIGNAL_BATCH_MAX", "50"))
+
+class SignalBatch(BaseModel):
+    signals: List[dict]
+    wait_ack: bool = True  # Hold the response until every order is acknowledged
+
+@app.post("/api/signals/batch")
+async def handle_signal_batch(batch: SignalBatch):
+    """Trade several signals at once and return a result and timings for each
+
+    The batch runs inline rather than through the queue: contracts for every signal
+    are resolved concurrently and the orders are then placed together.
+    """
+    received_at = time_lib.perf_counter()
+    SIGNALS.inc(len(batch.signals))
+    if not batch.signals:
+        raise HTTPException(status_code=400, detail="Batch has no signals")
+    if len(batch.signals) > SIGNAL_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {SIGNAL_BATCH_MAX} signals")
+    if not settings.trading_enabled:
+        SIGNAL_REJECTS.inc(len(batch.signals))
+        return {"status": "error", "message": "Trading is disabled"}
+    if market_calendar.past_cutoff():
+        SIGNAL_REJECTS.inc(len(batch.signals))
+        return {"status": "error", "message": "Trading hours ended"}
+
+    result = await ib_handler.process_signals(batch.signals, received_at=received_at, wait_ack=batch.wait_ack)
+    SIGNAL_REJECTS.inc(result["count"] - result["succeeded"])
+    return result
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     active_connections.add(websocket)
+    # Clients opt into the delta protocol and MessagePack with ?protocol=2&encoding=msgpack
+    protocol = PROTOCOL_VERSION if websocket.query_params.get("protocol") == str(PROTOCOL_VERSION) else 1
+    encoding = negotiate_encoding(websocket.query_params.get("encoding"))
+    # Data frames and heartbeats come from the shared hub through this client's channel
+    channel = hub.add(websocket, protocol=protocol, encoding=encoding)
     
     try:
-        # Start heartbeat and data update tasks
-        heartbeat_task = asyncio.create_task(send_heartbeat(websocket))
-        data_task = asyncio.create_task(send_data_updates(websocket))
-        
         # Listen for client messages
         while True:
             try:
-                message = await websocket.receive_text()
-                # Handle any client messages if needed
-                await websocket.send_json({
+                frame = await websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(frame.get("code", status.WS_1000_NORMAL_CLOSURE))
+                try:
+                    message = decode(frame.get("bytes") or frame.get("text") or "{}")
+                except ValueError:
+                    message = {}
+                if not isinstance(message, dict):
+                    message = {}
+
+                # A client that fell behind sends its last sequence number to catch up
+                if message.get("type") == "resync" and protocol >= 2:
+                    hub.resync(channel, int(message.get("lastSeq", -1)))
+                    continue
+
+                channel.offer_control(encode({
                     "type": "acknowledgment",
                     "message": "Message received",
                     "timestamp": time_lib.time()
-                })
+                }, encoding))
             except WebSocketDisconnect:
-                print("Client disconnected normally")
+                log.info("Client disconnected normally")
                 break
             except Exception as e:
-                print(f"Error processing message: {e}")
+                log.error(f"Error processing message: {e}")
                 # Don't break here, continue listening
 
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        log.error(f"WebSocket error: {e}")
     finally:
         # Cleanup
         try:
-            heartbeat_task.cancel()
-            data_task.cancel()
-            active_connections.remove(websocket)
+            hub.remove(websocket)
+            active_connections.discard(websocket)
             if websocket.client_state == WebSocketState.CONNECTED:
                 await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
         except Exception as e:
-            print(f"Error during WebSocket cleanup: {e}")
-
+            log.error(f"Error during WebSocket cleanup: {e}")
 @app.get("/api/positions")
-async def get_positions():
+async def get_positions(request: Request):
     try:
-        positions = await ib_handler.get_positions()
-        # Clean any invalid float values
-        for pos in positions:
-            if math.isnan(pos['unrealizedPNL']) or math.isinf(pos['unrealizedPNL']):
-                pos['unrealizedPNL'] = 0.0
-            if math.isnan(pos['avgCost']) or math.isinf(pos['avgCost']):
-                pos['avgCost'] = 0.0
-            if math.isnan(pos['marketPrice']) or math.isinf(pos['marketPrice']):
-                pos['marketPrice'] = 0.0
-        return positions
+        # Records are sanitized and pre-encoded when IB reports them
+        return responses.response(request, "positions", ib_handler.versions["positions"],
+                                  ib_handler.encoded_positions, headers=stale_headers())
     except Exception as e:
-        print(f"Error in get_positions endpoint: {e}")
+        log.error(f"Error in get_positions endpoint: {e}")
         raise HTTPException(status_code=500, detail="Failed to get positions")
 
 @app.get("/api/orders")
-async def get_orders():
-    return await ib_handler.get_orders()
+async def get_orders(request: Request):
+    return responses.response(request, "orders", ib_handler.versions["orders"],
+                              ib_handler.encoded_orders, headers=stale_headers())
+
+@app.get("/api/orders/latency")
+async def get_order_latency(limit: int = 50, con_id: int = None):
+    """Submit-to-ack and ack-to-fill latencies across the session, with the most recent orders"""
+    return {
+        "summary": ib_handler.orders.latency_summary(),
+        "orders": ib_handler.orders.recent(max(0, limit), con_id=con_id)
+    }
+
+@app.get("/api/orders/by-perm/{perm_id}")
+async def get_order_by_perm_id(perm_id: int):
+    lifecycle = ib_handler.orders.get_by_perm_id(perm_id)
+    if lifecycle is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return lifecycle.to_dict()
+
+@app.get("/api/orders/{order_id}")
+async def get_order(order_id: int):
+    """One order with the time it reached each state"""
+    lifecycle = ib_handler.orders.get(order_id)
+    if lifecycle is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return lifecycle.to_dict()
 
 class PositionClose(BaseModel):
     position_id: int
@@ -213,6 +412,80 @@ async def cancel_order(data: OrderCancel):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Values owned by other components are read at scrape time
+REGISTRY.gauge('ws_clients', 'Connected WebSocket clients', lambda: len(hub.channels))
+REGISTRY.gauge('market_data_lines', 'Open market data subscriptions',
+               lambda: len(ib_handler.market_data.lines))
+REGISTRY.gauge('signal_queue_depth', 'Signals waiting for a worker',
+               lambda: signal_queue.queued)
+REGISTRY.gauge('ib_connected', '1 while every IB client is connected',
+               lambda: 0 if ib_handler.pool.down_since() else 1)
+REGISTRY.gauge('square_off_time_to_flat_seconds', 'Duration of the last auto square-off',
+               lambda: (ib_handler.last_square_off or {}).get('timeToFlatMs', 0) / 1000)
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/square-off")
+async def get_square_off():
+    return {
+        "nextSquareOff": market_calendar.next_square_off().isoformat(),
+        "last": ib_handler.last_square_off
+    }
+
+@app.get("/api/market-data")
+async def get_market_data():
+    return {**ib_handler.market_data.status(), "ticks": ib_handler.ticks.status()}
+
+@app.get("/api/connection")
+async def get_connection():
+    return ib_handler.pool.status()
+
+@app.get("/api/debug/memory")
+async def get_memory():
+    """Size of every long-lived structure, to confirm memory stays flat across sessions"""
+    return {
+        **retention.memory_usage(),
+        "signalQueue": {
+            "jobs": len(signal_queue.jobs),
+            "dedupEntries": len(signal_queue.recent),
+            "symbols": len(signal_queue.pending),
+        },
+        "responseCache": len(responses.entries),
+        "websocketClients": len(hub.channels),
+        "retention": retention.status(),
+    }
+
+@app.get("/api/journal")
+async def get_journal(start: float = None, end: float = None, symbol: str = None, kind: str = None,
+                      limit: int = 1000):
+    """Journal entries with start <= ts < end (epoch seconds), oldest first
+
+    symbol matches an underlying such as SPY or a contract's local symbol; kind is
+    one of signal, order, fill, position or pnl.
+    """
+    if journal is None:
+        raise HTTPException(status_code=404, detail="Journal is disabled")
+    if kind is not None and kind not in JOURNAL_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(JOURNAL_KINDS)}")
+    limit = max(1, min(limit, 10000))
+    # SQLite reads run on a worker thread so a large range never stalls the event loop
+    entries = await asyncio.get_event_loop().run_in_executor(
+        None, lambda: journal.query(start=start, end=end, symbol=symbol, kind=kind, limit=limit)
+    )
+    return {"count": len(entries), "entries": entries}
+
+@app.get("/api/journal/status")
+async def get_journal_status():
+    if journal is None:
+        raise HTTPException(status_code=404, detail="Journal is disabled")
+    return journal.status()
+
+@app.get("/api/reconciliation")
+async def get_reconciliation():
+    return ib_handler.reconciler.status()
+
 @app.get("/api/settings")
 async def get_settings():
     return settings
@@ -222,17 +495,42 @@ async def update_settings(new_settings: Settings):
     global settings
     settings = new_settings
     ib_handler.settings = new_settings  # Update IBHandler settings
+    # Qualify any newly configured strikes ahead of the next signal
+    asyncio.create_task(ib_handler.warm_contract_cache())
     with open(SETTINGS_PATH, "w") as f:
         json.dump(settings.dict(), f)
     return settings
 
 @app.get("/api/spy-price")
-async def get_spy_price():
+async def get_spy_price(request: Request):
     try:
         spy_price = await ib_handler.get_spy_price()
-        if math.isnan(spy_price) or math.isinf(spy_price):
-            spy_price = 0.0
-        return {"price": spy_price}
+        return responses.response(request, "spy_price", ib_handler.versions["spy_price"],
+                                  lambda: dumps({"price": clean_float(spy_price)}), headers=stale_headers())
     except Exception as e:
-        print(f"Error in get_spy_price endpoint: {e}")
-        raise HTTPException(status_code=500, detail="Failed to get SPY price")
\ No newline at end of file
+        log.error(f"Error in get_spy_price endpoint: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get SPY price")
+
+@app.get("/api/bars/{symbol}")
+async def get_bars(symbol: str, request: Request, interval: str = "1m", limit: int = 300, format: str = "json"):
+    """Recent OHLCV bars built from live ticks; format=binary returns the raw float64 rows"""
+    if interval not in BAR_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Interval must be one of {', '.join(BAR_INTERVALS)}")
+    segments = ib_handler.tick_store.bars(symbol.upper(), interval, limit)
+    if segments is None:
+        raise HTTPException(status_code=404, detail=f"No market data recorded for {symbol}")
+
+    if format == "binary" or request.headers.get("accept") == "application/octet-stream":
+        # Copied, since ticks keep updating the ring buffer while the body is sent
+        body = b"".join(segment.tobytes() for segment in segments)
+        return Response(content=body, media_type="application/octet-stream", headers={
+            "X-Bar-Fields": ",".join(BAR_FIELDS),
+            "X-Bar-Dtype": segments[0].dtype.str if segments else "<f8",
+            "X-Bar-Count": str(sum(len(segment) for segment in segments))
+        })
+
+    columns = {field: [] for field in BAR_FIELDS}
+    for segment in segments:
+        for i, field in enumerate(BAR_FIELDS):
+            columns[field].extend(segment[:, i].tolist())
+    return {"symbol": symbol.upper(), "interval": interval, **columns}
@@ -0,0 +1,177 @@
+import bisect
+import math
+
+# Upper bounds in seconds, from sub-millisecond callbacks to multi-second fills
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    __slots__ = ('name', 'help', 'value')
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def render(self):
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} counter",
+            f"{self.name} {_format_value(self.value)}",
+        ]
+
+
+class LabeledCounter:
+    """Counter with one series per value of a single label"""
+
+    __slots__ = ('name', 'help', 'label', 'values')
+
+    def __init__(self, name, help, label):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values = {}
+
+    def inc(self, label_value, amount=1):
+        self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} counter",
+        ]
+        for label_value, value in self.values.items():
+            lines.append(f'{self.name}{{{self.label}="{label_value}"}} {_format_value(value)}')
+        return lines
+
+
+class Gauge:
+    """Gauge that is either set directly or read from a callback at scrape time"""
+
+    __slots__ = ('name', 'help', 'value', 'callback')
+
+    def __init__(self, name, help, callback=None):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self.callback = callback
+
+    def set(self, value):
+        self.value = value
+
+    def render(self):
+        value = self.callback() if self.callback else self.value
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {_format_value(value if value is not None else 0)}",
+        ]
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and two additions"""
+
+    __slots__ = ('name', 'help', 'bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # Last slot is the +Inf overflow
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} histogram",
+        ]
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_format_value(bound)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format_value(self.sum)}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help):
+        return self._register(Counter(name, help))
+
+    def labeled_counter(self, name, help, label):
+        return self._register(LabeledCounter(name, help, label))
+
+    def gauge(self, name, help, callback=None):
+        return self._register(Gauge(name, help, callback))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, buckets))
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+SIGNAL_LATENCY = REGISTRY.histogram(
+    'signal_to_order_seconds', 'Time from receiving a signal to placeOrder')
+SIGNAL_QUEUE_WAIT = REGISTRY.histogram(
+    'signal_queue_wait_seconds', 'Time a signal waited in the queue before a worker took it')
+CONTRACT_RESOLVE_LATENCY = REGISTRY.histogram(
+    'contract_resolve_seconds', 'Time to resolve the contract for a signal')
+ORDER_ACK_LATENCY = REGISTRY.histogram(
+    'order_ack_seconds', 'Time from placeOrder to the first acknowledging status')
+ORDER_FILL_LATENCY = REGISTRY.histogram(
+    'order_fill_seconds', 'Time from placeOrder to Filled')
+TICK_INTERVAL = REGISTRY.histogram(
+    'tick_interarrival_seconds', 'Time between consecutive ticker updates from IB, before conflation')
+SNAPSHOT_ENCODE_TIME = REGISTRY.histogram(
+    'ws_snapshot_encode_seconds', 'Time to build and encode a WebSocket snapshot')
+CLIENT_SEND_TIME = REGISTRY.histogram(
+    'ws_client_send_seconds', 'Time to write one frame to one WebSocket client')
+
+RECOVERY_TIME = REGISTRY.histogram(
+    'ib_recovery_seconds', 'Time from losing an IB connection to state restored',
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0))
+
+SIGNALS = REGISTRY.counter('signals_total', 'Signals received')
+SIGNAL_REJECTS = REGISTRY.counter('signal_rejects_total', 'Signals rejected or failed')
+SIGNAL_DUPLICATES = REGISTRY.counter('signal_duplicates_total', 'Signals dropped as duplicates of a recent one')
+ORDERS_PLACED = REGISTRY.counter('orders_placed_total', 'Orders submitted to IB')
+RECONNECTS = REGISTRY.counter('ib_reconnects_total', 'Connections to IB after the first')
+WS_FRAMES_DROPPED = REGISTRY.counter('ws_frames_dropped_total', 'Frames dropped for slow WebSocket clients')
+TICKS_RECEIVED = REGISTRY.counter('ticks_received_total', 'Tickers delivered by pendingTickersEvent')
+TICKS_PROCESSED = REGISTRY.labeled_counter(
+    'ticks_processed_total', 'Conflated tickers handed to each tick consumer', 'consumer')
+RESPONSE_CACHE_HITS = REGISTRY.counter('response_cache_hits_total', 'REST responses served from the encoded cache')
+RESPONSE_NOT_MODIFIED = REGISTRY.counter('response_not_modified_total', 'REST requests answered with 304 Not Modified')
+RECONCILE_DRIFT = REGISTRY.counter('reconcile_drift_corrections_total', 'Entries corrected by reconciliation')
@@ -1,10 +1,11 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Literal
 
 class Settings(BaseModel):
     trading_enabled: bool = True
     quantity: int = 1
     dte: int = 0  # 0 for today, 1 for tomorrow
-    otm_strikes: int = 2  # Number of OTM strikes to show
+    otm_strikes: int = 2  # Strikes out of the money to trade when no fixed strike is set
     call_strike: Optional[float] = None  # Strike price for calls
-    put_strike: Optional[float] = None   # Strike price for puts
\ No newline at end of file
+    put_strike: Optional[float] = None   # Strike price for puts
+    exit_policy: Literal['all', 'oldest', 'largest'] = 'oldest'  # Which legs an exit closes when several match
@@ -0,0 +1,159 @@
+import math
+
+from ..serialization import dumps
+
+
+def clean_float(value):
+    """Convert to float, mapping None/NaN/inf (common in IB data) to 0.0"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if math.isnan(value) or math.isinf(value):
+        return 0.0
+    return value
+
+
+class Record:
+    """Base for state records: values are sanitized on ingest, the dict and JSON forms are
+    built on first read and cached until the record changes"""
+
+    __slots__ = ('_dict', '_encoded')
+
+    def _invalidate(self):
+        self._dict = None
+        self._encoded = None
+
+    def _set(self, **values):
+        """Assign changed values; returns True if anything changed"""
+        changed = False
+        for name, value in values.items():
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+                changed = True
+        if changed:
+            self._invalidate()
+        return changed
+
+    def to_dict(self):
+        """Cached API representation; callers must treat it as read-only"""
+        if self._dict is None:
+            self._dict = self._build_dict()
+        return self._dict
+
+    def encoded(self):
+        """Cached JSON encoding of to_dict()"""
+        if self._encoded is None:
+            self._encoded = dumps(self.to_dict())
+        return self._encoded
+
+    def _build_dict(self):
+        raise NotImplementedError
+
+
+class PositionRecord(Record):
+    __slots__ = ('con_id', 'local_symbol', 'sec_type', 'exchange',
+                 'position', 'avg_cost', 'market_price', 'unrealized_pnl')
+
+    def __init__(self, contract, position, avg_cost):
+        self.con_id = contract.conId
+        self.local_symbol = contract.localSymbol
+        self.sec_type = contract.secType
+        self.exchange = contract.exchange
+        self.position = clean_float(position)
+        self.avg_cost = clean_float(avg_cost)
+        self.market_price = 0.0  # Filled in by portfolio updates
+        self.unrealized_pnl = 0.0
+        self._invalidate()
+
+    def update_position(self, position, avg_cost):
+        return self._set(position=clean_float(position), avg_cost=clean_float(avg_cost))
+
+    def update_market(self, market_price, unrealized_pnl):
+        return self._set(market_price=clean_float(market_price), unrealized_pnl=clean_float(unrealized_pnl))
+
+    def _build_dict(self):
+        return {
+            'contract': {
+                'conId': self.con_id,
+                'localSymbol': self.local_symbol,
+                'secType': self.sec_type,
+                'exchange': self.exchange,
+            },
+            'position': self.position,
+            'avgCost': self.avg_cost,
+            'marketPrice': self.market_price,
+            'unrealizedPNL': self.unrealized_pnl
+        }
+
+
+class OrderRecord(Record):
+    __slots__ = ('order_id', 'local_symbol', 'sec_type', 'action', 'total_quantity', 'order_type',
+                 'status', 'filled', 'remaining', 'avg_fill_price', 'error_message')
+
+    def __init__(self, trade):
+        order, contract = trade.order, trade.contract
+        self.order_id = order.orderId
+        self.local_symbol = contract.localSymbol
+        self.sec_type = contract.secType
+        self.action = order.action
+        self.total_quantity = clean_float(order.totalQuantity)
+        self.order_type = order.orderType
+        self.status = None
+        self.filled = None
+        self.remaining = None
+        self.avg_fill_price = None
+        self.error_message = None
+        self.update(trade)
+
+    def update(self, trade):
+        status = trade.orderStatus
+        return self._set(
+            status=status.status,
+            filled=clean_float(status.filled),
+            remaining=clean_float(status.remaining),
+            avg_fill_price=clean_float(status.avgFillPrice),
+            error_message=getattr(trade, 'errorMessage', '')
+        )
+
+    def _build_dict(self):
+        return {
+            'orderId': self.order_id,
+            'contract': {
+                'localSymbol': self.local_symbol,
+                'secType': self.sec_type,
+            },
+            'action': self.action,
+            'totalQuantity': self.total_quantity,
+            'orderType': self.order_type,
+            'status': self.status,
+            'filled': self.filled,
+            'remaining': self.remaining,
+            'avgFillPrice': self.avg_fill_price,
+            'errorMessage': self.error_message
+        }
+
+
+class PnLRecord(Record):
+    __slots__ = ('daily', 'unrealized', 'realized')
+
+    def __init__(self):
+        self.daily = 0.0
+        self.unrealized = 0.0
+        self.realized = 0.0
+        self._invalidate()
+
+    def update(self, pnl):
+        return self._set(
+            daily=clean_float(pnl.dailyPnL),
+            unrealized=clean_float(pnl.unrealizedPnL),
+            realized=clean_float(pnl.realizedPnL)
+        )
+
+    def _build_dict(self):
+        return {
+            'dailyPnL': self.daily,
+            'unrealizedPnL': self.unrealized,
+            'realizedPnL': self.realized,
+            'totalPnL': self.unrealized + self.realized
+        }
@@ -0,0 +1,76 @@
+import json
+import os
+
+from starlette.responses import Response
+
+from .metrics import RESPONSE_CACHE_HITS, RESPONSE_NOT_MODIFIED
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib encoder produces the same JSON
+    orjson = None
+
+
+def dumps(value):
+    """Encode value as compact UTF-8 JSON bytes using the fastest encoder available"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':')).encode()
+
+
+def dumps_text(value):
+    """Encode value as compact JSON text, for WebSocket text frames"""
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    return json.dumps(value, separators=(',', ':'))
+
+
+def join_array(fragments):
+    """JSON array from already-encoded items"""
+    return b'[' + b','.join(fragments) + b']'
+
+
+class ResponseCache:
+    """Encoded REST bodies cached per state version, with ETags derived from the version
+
+    A client that sends back the ETag it was given gets a 304 until the version moves,
+    so polling unchanged state never touches the encoder.
+    """
+
+    def __init__(self):
+        # ETags must not repeat across restarts, when versions start over from zero
+        self.instance = os.urandom(4).hex()
+        self.entries = {}  # name -> (version, etag, body)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, name, version, build):
+        """Return (etag, body) for name at version, calling build() only on a miss"""
+        entry = self.entries.get(name)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            RESPONSE_CACHE_HITS.inc()
+            return entry[1], entry[2]
+        self.misses += 1
+        etag = f'"{self.instance}-{name}-{version}"'
+        body = build()
+        self.entries[name] = (version, etag, body)
+        return etag, body
+
+    def response(self, request, name, version, build, headers=None):
+        """JSON response for name, or 304 if the request already holds the current ETag"""
+        etag, body = self.get(name, version, build)
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache', **(headers or {})}
+        if etag_matches(request.headers.get('if-none-match'), etag):
+            self.not_modified += 1
+            RESPONSE_NOT_MODIFIED.inc()
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type='application/json', headers=headers)
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags or f"W/{etag}" in tags
@@ -0,0 +1,100 @@
+import asyncio
+import time as time_lib
+from ..logging_config import get_logger
+from ..metrics import TICKS_RECEIVED, TICKS_PROCESSED, TICK_INTERVAL
+
+log = get_logger('ticks')
+
+
+class TickConsumer:
+    """One downstream reader with its own pending set and maximum rate"""
+
+    def __init__(self, name, callback, interval=0.0):
+        self.name = name
+        self.callback = callback  # Called with the tickers that changed since its last run
+        self.interval = interval  # Minimum seconds between runs, 0 runs on every loop pass
+        self.pending = {}  # conId -> Ticker, only the latest state per contract
+        self.received = 0
+        self.processed = 0
+        self.runs = 0
+        self.wakeup = None
+        self.task = None
+
+    async def run(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            tickers, self.pending = list(self.pending.values()), {}
+            self.processed += len(tickers)
+            self.runs += 1
+            TICKS_PROCESSED.inc(self.name, len(tickers))
+            try:
+                self.callback(tickers)
+            except Exception as e:
+                log.error(f"Error in {self.name} tick consumer: {e}")
+            if self.interval:
+                await asyncio.sleep(self.interval)
+
+
+class TickConflator:
+    """Absorbs pendingTickersEvent bursts, keeping only the latest state per contract
+
+    The IB callback only records which contracts changed; each consumer drains its
+    own pending set from a separate task, so a burst at the open costs one pass per
+    consumer instead of one per tick, and never runs ahead of order handling.
+    """
+
+    def __init__(self):
+        self.consumers = {}
+        self.received = 0
+        self.last_arrival = None  # perf_counter of the last pendingTickersEvent
+
+    def add_consumer(self, name, callback, interval=0.0):
+        self.consumers[name] = TickConsumer(name, callback, interval)
+        return self.consumers[name]
+
+    def on_tickers(self, tickers):
+        """pendingTickersEvent handler"""
+        # Measured on arrival, before conflation, so consumer intervals don't hide bursts
+        now = time_lib.perf_counter()
+        if self.last_arrival is not None:
+            TICK_INTERVAL.observe(now - self.last_arrival)
+        self.last_arrival = now
+        count = len(tickers)
+        self.received += count
+        TICKS_RECEIVED.inc(count)
+        for consumer in self.consumers.values():
+            pending = consumer.pending
+            for ticker in tickers:
+                pending[ticker.contract.conId] = ticker
+            consumer.received += count
+            if consumer.wakeup is not None:
+                consumer.wakeup.set()
+
+    def start(self):
+        """Start consumer tasks on the running loop; safe to call again after a reconnect"""
+        for consumer in self.consumers.values():
+            if consumer.task is None or consumer.task.done():
+                consumer.wakeup = consumer.wakeup or asyncio.Event()
+                consumer.task = asyncio.ensure_future(consumer.run())
+
+    def stop(self):
+        for consumer in self.consumers.values():
+            if consumer.task is not None:
+                consumer.task.cancel()
+                consumer.task = None
+
+    def status(self):
+        return {
+            "received": self.received,
+            "consumers": {
+                name: {
+                    "intervalMs": consumer.interval * 1000,
+                    "received": consumer.received,
+                    "processed": consumer.processed,
+                    "conflated": consumer.received - consumer.processed - len(consumer.pending),
+                    "runs": consumer.runs,
+                }
+                for name, consumer in self.consumers.items()
+            }
+        }
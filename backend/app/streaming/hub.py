@@ -0,0 +1,163 @@
+import asyncio
+import time as time_lib
+from starlette.websockets import WebSocketState
+from .protocol import DeltaTracker, encode
+from ..logging_config import get_logger
+from ..metrics import SNAPSHOT_ENCODE_TIME, CLIENT_SEND_TIME, WS_FRAMES_DROPPED
+
+log = get_logger('websocket')
+
+
+class ClientChannel:
+    """Bounded per-client send queue drained by its own writer task"""
+
+    def __init__(self, websocket, max_queue=8, protocol=1, encoding='json'):
+        self.websocket = websocket
+        self.protocol = protocol  # 1 = full data frames, 2 = sequenced deltas
+        self.encoding = encoding
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.task = None
+
+    def offer(self, frame):
+        """Queue a frame without blocking; a full queue drops its oldest frame"""
+        if self.queue.full():
+            # Snapshots supersede each other, so a slow client only misses stale ones
+            self.queue.get_nowait()
+            self.dropped += 1
+            WS_FRAMES_DROPPED.inc()
+        self.queue.put_nowait(frame)
+
+    def offer_control(self, frame):
+        """Queue a heartbeat or acknowledgment; a full delta client skips it rather than lose a delta"""
+        if self.protocol >= 2 and self.queue.full():
+            self.dropped += 1
+            WS_FRAMES_DROPPED.inc()
+            return
+        self.offer(frame)
+
+    def reset(self, frame):
+        """Replace everything queued with frame, used when a delta client falls behind"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.dropped += 1
+            WS_FRAMES_DROPPED.inc()
+        self.queue.put_nowait(frame)
+
+    async def run(self):
+        while True:
+            frame = await self.queue.get()
+            if self.websocket.client_state != WebSocketState.CONNECTED:
+                break
+            try:
+                started = time_lib.perf_counter()
+                if isinstance(frame, bytes):
+                    await self.websocket.send_bytes(frame)
+                else:
+                    await self.websocket.send_text(frame)
+                CLIENT_SEND_TIME.observe(time_lib.perf_counter() - started)
+            except Exception as e:
+                log.error(f"Error sending to WebSocket client: {e}")
+                break
+
+
+class BroadcastHub:
+    """Builds and encodes one snapshot per change and fans it out to every client"""
+
+    def __init__(self, build_snapshot, notifier, keepalive=30.0, max_queue=8, history=256):
+        self.build_snapshot = build_snapshot
+        self.notifier = notifier
+        self.keepalive = keepalive  # Heartbeat interval while the book is quiet
+        self.max_queue = max_queue
+        self.tracker = DeltaTracker(history)
+        self.channels = {}  # websocket -> ClientChannel
+
+    def add(self, websocket, protocol=1, encoding='json'):
+        channel = ClientChannel(websocket, self.max_queue, protocol, encoding)
+        channel.task = asyncio.create_task(channel.run())
+        self.channels[websocket] = channel
+        # New clients get the current state immediately rather than on the next change
+        asyncio.create_task(self.send_snapshot(channel))
+        return channel
+
+    def remove(self, websocket):
+        channel = self.channels.pop(websocket, None)
+        if channel and channel.task:
+            channel.task.cancel()
+
+    def publish(self, message):
+        """Send an unsequenced message to every client, encoding it only once per encoding"""
+        frames = {}
+        for channel in list(self.channels.values()):
+            if channel.encoding not in frames:
+                frames[channel.encoding] = encode(message, channel.encoding)
+            channel.offer_control(frames[channel.encoding])
+
+    def publish_update(self, full, delta, exclude=None):
+        """Send a change as full frames to v1 clients and as a delta to v2 clients"""
+        frames = {}
+        for channel in list(self.channels.values()):
+            if channel is exclude:
+                continue
+            lagging = channel.protocol >= 2 and channel.queue.full()
+            variant = (channel.protocol, channel.encoding, lagging)
+            if variant not in frames:
+                if lagging:
+                    # Dropping a delta would break the sequence, so a lagging client is reset
+                    message = self.tracker.snapshot_message()
+                else:
+                    message = delta if channel.protocol >= 2 else full
+                frames[variant] = encode(message, channel.encoding)
+            if lagging:
+                channel.reset(frames[variant])
+            else:
+                channel.offer(frames[variant])
+
+    async def refresh(self):
+        """Build the current snapshot once and advance the delta tracker"""
+        timestamp = time_lib.time()
+        data = await self.build_snapshot()
+        delta = self.tracker.apply(data, timestamp)
+        return {"type": "data", "timestamp": timestamp, "data": data}, delta
+
+    async def send_snapshot(self, channel):
+        try:
+            full, delta = await self.refresh()
+            if delta is not None:
+                # Keep other delta clients in sequence with the state just captured
+                self.publish_update(full, delta, exclude=channel)
+            if channel.protocol >= 2:
+                channel.offer(encode(self.tracker.snapshot_message(), channel.encoding))
+            else:
+                channel.offer(encode(full, channel.encoding))
+        except Exception as e:
+            log.error(f"Error sending initial snapshot: {e}")
+    def resync(self, channel, last_seq):
+        """Replay deltas after last_seq, or send a fresh snapshot if they have aged out"""
+        deltas = self.tracker.since(last_seq)
+        if deltas is None or len(deltas) + channel.queue.qsize() >= channel.queue.maxsize:
+            channel.reset(encode(self.tracker.snapshot_message(), channel.encoding))
+            return
+        for delta in deltas:
+            channel.offer(encode(delta, channel.encoding))
+
+    async def run(self):
+        """Push one shared frame per debounced batch of changes, heartbeats when idle"""
+        while True:
+            try:
+                changed = await self.notifier.wait(self.keepalive)
+                if not self.channels:
+                    continue
+                if changed:
+                    started = time_lib.perf_counter()
+                    full, delta = await self.refresh()
+                    if delta is not None:
+                        self.publish_update(full, delta)
+                    SNAPSHOT_ENCODE_TIME.observe(time_lib.perf_counter() - started)
+                else:
+                    self.publish({"type": "heartbeat", "timestamp": time_lib.time(), "seq": self.tracker.seq})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Broadcast error: {e}")
+                await asyncio.sleep(1)
@@ -0,0 +1,37 @@
+import asyncio
+
+
+class ChangeNotifier:
+    """Coalesces state change events from IB callbacks into debounced wake-ups"""
+
+    def __init__(self, debounce=0.05):
+        self.debounce = debounce  # Seconds to collect further changes before waking
+        self.changed = set()
+        self._event = None  # Created lazily so it binds to the running loop
+
+    def _get_event(self):
+        if self._event is None:
+            self._event = asyncio.Event()
+        return self._event
+
+    def notify(self, kind):
+        """Record that a part of the state ('positions', 'orders', 'pnl') changed"""
+        self.changed.add(kind)
+        if self._event is not None:
+            self._event.set()
+
+    async def wait(self, timeout=None):
+        """Wait for changes, then hold for the debounce window; returns the changed kinds"""
+        event = self._get_event()
+        if not self.changed:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return set()
+
+        if self.debounce:
+            await asyncio.sleep(self.debounce)
+
+        event.clear()
+        changed, self.changed = self.changed, set()
+        return changed
@@ -0,0 +1,118 @@
+import json
+from collections import deque
+
+from ..serialization import dumps_text
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional, clients fall back to JSON
+    msgpack = None
+
+PROTOCOL_VERSION = 2
+
+# Collections diffed by key, everything else in a snapshot is replaced wholesale
+KEYED_COLLECTIONS = {
+    'positions': lambda item: item['contract']['conId'],
+    'orders': lambda item: item['orderId'],
+}
+
+
+def negotiate_encoding(requested):
+    """Return the encoding a client asked for if this server can produce it"""
+    if requested == 'msgpack' and msgpack is not None:
+        return 'msgpack'
+    return 'json'
+
+
+def encode(message, encoding='json'):
+    if encoding == 'msgpack':
+        return msgpack.packb(message, use_bin_type=True)
+    # The dashboard parses JSON from text frames, and ASGI text frames are str
+    return dumps_text(message)
+
+
+def decode(frame):
+    if isinstance(frame, (bytes, bytearray)):
+        if msgpack is None:
+            raise ValueError("Binary frame received but msgpack is not installed")
+        return msgpack.unpackb(frame, raw=False)
+    return json.loads(frame)
+
+
+class DeltaTracker:
+    """Turns successive snapshots into sequenced add/update/remove patches"""
+
+    def __init__(self, history=256):
+        self.seq = 0
+        self.state = {}
+        self.history = deque(maxlen=history)  # Recent deltas kept for client resync
+
+    def snapshot_message(self):
+        return {
+            "type": "snapshot",
+            "version": PROTOCOL_VERSION,
+            "seq": self.seq,
+            "data": {
+                name: list(value.values()) if name in KEYED_COLLECTIONS else value
+                for name, value in self.state.items()
+            }
+        }
+
+    def apply(self, snapshot, timestamp=None):
+        """Diff snapshot against the last one; returns the delta message or None if unchanged"""
+        patches = {}
+        for name, value in snapshot.items():
+            if name in KEYED_COLLECTIONS:
+                key_of = KEYED_COLLECTIONS[name]
+                # State records rebuild their dict on change, so an unchanged item is the same object
+                new_items = {key_of(item): item for item in value}
+                patch = self._diff_keyed(self.state.get(name, {}), new_items)
+                if patch:
+                    patches[name] = patch
+                self.state[name] = new_items
+            elif self.state.get(name) != value:
+                value = dict(value) if isinstance(value, dict) else value
+                patches[name] = {"replace": value}
+                self.state[name] = value
+
+        if not patches:
+            return None
+
+        self.seq += 1
+        delta = {
+            "type": "delta",
+            "version": PROTOCOL_VERSION,
+            "seq": self.seq,
+            "timestamp": timestamp,
+            "patches": patches
+        }
+        self.history.append(delta)
+        return delta
+
+    def since(self, last_seq):
+        """Deltas after last_seq, or None if they are no longer retained"""
+        if last_seq == self.seq:
+            return []
+        if not self.history or last_seq < self.history[0]["seq"] - 1 or last_seq > self.seq:
+            return None
+        return [delta for delta in self.history if delta["seq"] > last_seq]
+
+    @staticmethod
+    def _diff_keyed(old_items, new_items):
+        patch = {}
+        added = [item for key, item in new_items.items() if key not in old_items]
+        removed = [key for key in old_items if key not in new_items]
+        updated = []
+        for key, item in new_items.items():
+            old = old_items.get(key)
+            if old is not None and old is not item and old != item:
+                fields = {field: value for field, value in item.items() if old.get(field) != value}
+                updated.append({"key": key, "fields": fields})
+
+        if added:
+            patch["add"] = added
+        if updated:
+            patch["update"] = updated
+        if removed:
+            patch["remove"] = removed
+        return patch
@@ -0,0 +1,27 @@
+import os
+from ib_insync import IB
+from .simulator import SimulatedIB
+
+
+def create_broker(backend='ib'):
+    """Return the IB client for backend: 'ib' for a real gateway, 'sim' for the in-process simulator"""
+    if backend == 'sim':
+        return SimulatedIB(
+            spy_price=float(os.getenv('SIM_SPY_PRICE', '598.0')),
+            ack_latency=float(os.getenv('SIM_ACK_LATENCY', '0.005')),
+            fill_latency=float(os.getenv('SIM_FILL_LATENCY', '0.02')),
+            slippage=float(os.getenv('SIM_SLIPPAGE', '0.01')),
+            tick_interval=float(os.getenv('SIM_TICK_INTERVAL', '0.25')),
+            seed=int(os.environ['SIM_SEED']) if os.getenv('SIM_SEED') else None
+        )
+    if backend != 'ib':
+        raise ValueError(f"Unknown broker backend: {backend}")
+    return IB()
+
+
+def create_brokers(backend='ib'):
+    """Return (order entry client, market data client); the simulator serves both with one object"""
+    if backend == 'sim':
+        broker = create_broker(backend)
+        return broker, broker
+    return create_broker(backend), create_broker(backend)
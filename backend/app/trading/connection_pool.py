@@ -0,0 +1,249 @@
+import asyncio
+import random
+import time as time_lib
+from ..logging_config import get_logger
+from ..metrics import RECOVERY_TIME
+
+log = get_logger('ib')
+
+
+def parse_endpoints(value):
+    """Parse 'ib-gateway:4001,127.0.0.1:7497' into [(host, port), ...]"""
+    endpoints = []
+    for item in (value or '').split(','):
+        item = item.strip()
+        if item:
+            host, _, port = item.rpartition(':')
+            endpoints.append((host, int(port)))
+    return endpoints
+
+
+class Connection:
+    """One IB client and the endpoint it is currently attached to"""
+
+    def __init__(self, roles, client, client_id):
+        self.roles = roles
+        self.client = client
+        self.client_id = client_id
+        self.endpoint_index = 0
+        self.healthy = False
+        self.last_check = None
+        self.last_latency = None  # Seconds for the last health check round trip
+        self.reconnects = 0
+        self.down_since = None  # Wall-clock time the connection was lost, None while up
+        self.down_started = None  # Same moment on the monotonic clock, for recovery time
+        self.attempts = 0  # Reconnect attempts since it went down
+        self.last_recovery = None  # Seconds from losing the connection to state restored
+        self.recovery = None  # Task reconnecting this client while it is down
+
+    @property
+    def name(self):
+        return '+'.join(self.roles)
+
+
+class ConnectionPool:
+    """Supervised order entry and market data IB clients with endpoint failover"""
+
+    def __init__(self, clients, endpoints, client_ids, health_interval=10.0, health_timeout=2.0,
+                 backoff_initial=1.0, backoff_max=60.0, on_connected=None, on_state_change=None):
+        self.endpoints = list(endpoints)
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.backoff_initial = backoff_initial  # Seconds before the second reconnect attempt
+        self.backoff_max = backoff_max
+        self.on_connected = on_connected  # Awaited with (connection) after a reconnect, to restore state
+        self.on_state_change = on_state_change  # Called when a connection goes down or comes back
+        self.closed = False
+        self.wakeup = None
+        self.connections = []
+        by_client = {}
+        for role, client in clients.items():
+            connection = by_client.get(id(client))
+            if connection is None:
+                connection = by_client[id(client)] = Connection([role], client, client_ids[role])
+                self.connections.append(connection)
+            else:
+                connection.roles.append(role)
+        self.roles = {role: connection for connection in self.connections for role in connection.roles}
+        for connection in self.connections:
+            # Socket drops wake the supervisor at once instead of at the next health check
+            connection.client.disconnectedEvent += lambda connection=connection: self.mark_down(connection)
+
+    def client(self, role):
+        return self.roles[role].client
+
+    def is_connected(self):
+        return all(connection.client.isConnected() for connection in self.connections)
+
+    def down_since(self):
+        """When the first currently lost connection went down, None if all are up"""
+        times = [connection.down_since for connection in self.connections if connection.down_since is not None]
+        return min(times) if times else None
+
+    def mark_down(self, connection):
+        if self.closed or connection.down_since is not None:
+            return
+        connection.healthy = False
+        connection.down_since = time_lib.time()
+        connection.down_started = time_lib.perf_counter()
+        connection.attempts = 0
+        log.warning("IB connection lost", extra={'fields': {'client': connection.name}})
+        if self.on_state_change:
+            self.on_state_change()
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    async def connect(self):
+        """Connect every client, raising if one reaches no endpoint; the supervisor retries those"""
+        failed = []
+        for connection in self.connections:
+            if not await self.connect_client(connection):
+                self.mark_down(connection)
+                failed.append(connection.name)
+        if failed:
+            raise ConnectionError(f"No IB endpoint reachable for the {', '.join(failed)} client")
+
+    async def connect_client(self, connection, start=None):
+        """Try each endpoint once, beginning with start (default: the current one)"""
+        start = connection.endpoint_index if start is None else start
+        for offset in range(len(self.endpoints)):
+            index = (start + offset) % len(self.endpoints)
+            host, port = self.endpoints[index]
+            try:
+                await self._connect_endpoint(connection, host, port)
+            except Exception as e:
+                log.warning(f"Could not connect {connection.name} client to {host}:{port}: {e}")
+                continue
+            connection.endpoint_index = index
+            connection.healthy = True
+            log.info("Connected to IB", extra={'fields': {
+                'client': connection.name, 'clientId': connection.client_id, 'host': host, 'port': port
+            }})
+            return True
+        connection.healthy = False
+        return False
+
+    async def _connect_endpoint(self, connection, host, port):
+        try:
+            await connection.client.connectAsync(host, port, clientId=connection.client_id)
+        except Exception as e:
+            if "already in use" not in str(e).lower():
+                raise
+            # If client ID is in use, try with a random one
+            client_id = random.randint(100, 999)
+            log.info(f"Client ID {connection.client_id} in use, trying with {client_id}")
+            await connection.client.connectAsync(host, port, clientId=client_id)
+            connection.client_id = client_id
+
+    async def check(self, connection):
+        """Health check: the client is connected and answers reqCurrentTime in time"""
+        connection.last_check = time_lib.time()
+        if not connection.client.isConnected():
+            return False
+        started = time_lib.perf_counter()
+        try:
+            await asyncio.wait_for(connection.client.reqCurrentTimeAsync(), self.health_timeout)
+        except Exception:
+            return False
+        connection.last_latency = time_lib.perf_counter() - started
+        return True
+
+    def backoff(self, attempt):
+        """Delay before reconnect attempt number attempt (0-based), with equal jitter"""
+        if attempt == 0:
+            return 0.0
+        delay = min(self.backoff_max, self.backoff_initial * 2 ** (attempt - 1))
+        return random.uniform(delay / 2, delay)
+
+    async def recover(self, connection):
+        """Reconnect until it succeeds, then let the owner restore subscriptions and state"""
+        while not self.closed:
+            await asyncio.sleep(self.backoff(connection.attempts))
+            connection.attempts += 1
+            try:
+                connection.client.disconnect()
+            except Exception as e:
+                log.error(f"Error disconnecting {connection.name} client: {e}")
+            # The endpoint that just failed is tried last
+            if not await self.connect_client(connection, start=connection.endpoint_index + 1):
+                log.warning("IB reconnect attempt failed", extra={'fields': {
+                    'client': connection.name, 'attempt': connection.attempts
+                }})
+                continue
+
+            connection.reconnects += 1
+            if self.on_connected:
+                try:
+                    await self.on_connected(connection)
+                except Exception as e:
+                    log.error(f"Error restoring state after reconnecting {connection.name} client: {e}")
+                    continue
+            connection.last_recovery = time_lib.perf_counter() - connection.down_started
+            RECOVERY_TIME.observe(connection.last_recovery)
+            log.info("IB connection recovered", extra={'fields': {
+                'client': connection.name,
+                'attempts': connection.attempts,
+                'recoveryMs': round(connection.last_recovery * 1000, 3)
+            }})
+            connection.down_since = None
+            connection.down_started = None
+            if self.on_state_change:
+                self.on_state_change()
+            return
+
+    async def run(self):
+        """Supervise every client: health-check on a schedule, recover the ones that drop"""
+        self.wakeup = asyncio.Event()
+        if self.down_since() is not None:
+            self.wakeup.set()  # A client failed to connect at startup, start recovering now
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), self.health_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+                for connection in self.connections:
+                    if connection.down_since is None:
+                        connection.healthy = await self.check(connection)
+                        if connection.healthy:
+                            continue
+                        self.mark_down(connection)
+                    # Each client recovers in its own task so one dead endpoint cannot hold up the other
+                    if connection.recovery is None or connection.recovery.done():
+                        connection.recovery = asyncio.ensure_future(self.recover(connection))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Error in IB connection supervisor: {e}")
+
+    def disconnect(self):
+        self.closed = True
+        for connection in self.connections:
+            if connection.recovery is not None:
+                connection.recovery.cancel()
+            connection.healthy = False
+            if connection.client.isConnected():
+                connection.client.disconnect()
+
+    def status(self):
+        return {
+            "endpoints": [f"{host}:{port}" for host, port in self.endpoints],
+            "connections": [
+                {
+                    "roles": connection.roles,
+                    "clientId": connection.client_id,
+                    "endpoint": "{}:{}".format(*self.endpoints[connection.endpoint_index]),
+                    "connected": connection.client.isConnected(),
+                    "healthy": connection.healthy,
+                    "lastCheck": connection.last_check,
+                    "lastCheckMs": round(connection.last_latency * 1000, 3) if connection.last_latency is not None else None,
+                    "reconnects": connection.reconnects,
+                    "downSince": connection.down_since,
+                    "reconnectAttempts": connection.attempts,
+                    "lastRecoveryMs": round(connection.last_recovery * 1000, 3)
+                    if connection.last_recovery is not None else None,
+                }
+                for connection in self.connections
+            ]
+        }
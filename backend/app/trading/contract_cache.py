@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+
+class ContractCache:
+    """In-memory cache of qualified contracts keyed by (symbol, expiry, strike, right)"""
+
+    def __init__(self, ib, roll_days=8):
+        self.ib = ib
+        # Switch to the next future this many days before expiry. 8 is the CME equity index
+        # roll date, the Thursday before expiry week, when liquidity moves to the next quarter
+        self.roll_days = roll_days
+        self.contracts = {}
+
+    @staticmethod
+    def make_key(symbol, expiry, strike=0.0, right=''):
+        return (symbol, expiry, float(strike or 0.0), right or '')
+
+    @staticmethod
+    def key_for(contract):
+        return ContractCache.make_key(
+            contract.symbol,
+            contract.lastTradeDateOrContractMonth,
+            contract.strike,
+            contract.right
+        )
+
+    @staticmethod
+    def expiry_date(expiry):
+        """Parse an IB expiry string (YYYYMMDD or YYYYMM) into a date"""
+        if len(expiry) >= 8:
+            return datetime.strptime(expiry[:8], '%Y%m%d').date()
+        # Monthly expiries without a day are treated as expiring at month start
+        return datetime.strptime(expiry[:6], '%Y%m').date()
+
+    @staticmethod
+    def today():
+        return datetime.now(ZoneInfo('America/New_York')).date()
+
+    def get(self, symbol, expiry, strike=0.0, right=''):
+        return self.contracts.get(self.make_key(symbol, expiry, strike, right))
+
+    def put(self, contract):
+        self.contracts[self.key_for(contract)] = contract
+        return contract
+
+    def evict_expired(self, today=None):
+        """Drop every contract whose expiry date has passed"""
+        today = today or self.today()
+        expired = [
+            key for key in self.contracts
+            if self.expiry_date(key[1]) < today
+        ]
+        for key in expired:
+            del self.contracts[key]
+        return len(expired)
+
+    def front_month(self, symbol, today=None):
+        """Return the nearest future for symbol that is not yet inside the roll window"""
+        today = today or self.today()
+        roll_cutoff = today + timedelta(days=self.roll_days)
+        candidates = [
+            (key[1], contract) for key, contract in self.contracts.items()
+            if key[0] == symbol and contract.secType == 'FUT'
+            and self.expiry_date(key[1]) > roll_cutoff
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda item: item[0])[1]
+
+    async def resolve(self, contract):
+        """Return the cached contract, fetching contract details only on a miss"""
+        cached = self.contracts.get(self.key_for(contract))
+        if cached:
+            return cached
+
+        details = await self.ib.reqContractDetailsAsync(contract)
+        if not details:
+            return None
+        for detail in details:
+            self.put(detail.contract)
+        return details[0].contract
+
+    async def warm_futures(self, contract):
+        """Load every listed month for a future so front-month rolls are memory lookups"""
+        details = await self.ib.reqContractDetailsAsync(contract)
+        for detail in details:
+            self.put(detail.contract)
+        return len(details)
@@ -1,70 +1,142 @@
 from ib_insync import *
 import asyncio
-from datetime import datetime, timedelta, time
-import pytz
-import zoneinfo
-from zoneinfo import ZoneInfo
-import math
-import random
+import copy
+from datetime import datetime, timedelta
+import time as time_lib
+import logging
+from .contract_cache import ContractCache
+from .option_chain import OptionChain
+from .reconciler import Reconciler
+from .position_index import PositionIndex
+from .tick_store import TickStore
+from .market_data import MarketDataManager
+from .connection_pool import ConnectionPool
+from .order_store import OrderStore
+from ..models.state import PositionRecord, OrderRecord, PnLRecord
+from ..serialization import join_array
+from ..streaming.notifier import ChangeNotifier
+from ..streaming.conflator import TickConflator
+from . import market_calendar
+from ..logging_config import get_logger
+from ..metrics import (
+    SIGNAL_LATENCY, CONTRACT_RESOLVE_LATENCY, ORDERS_PLACED, RECONNECTS
+)
+
+log = get_logger('ib')
+tick_log = get_logger('ticks')
+order_log = get_logger('orders')
+position_log = get_logger('positions')
+signal_log = get_logger('signals')
+
 class IBHandler:
-    def __init__(self, settings):
-        self.ib = IB()
+    # Order states that show the broker has acknowledged an order or a cancel
+    ACK_STATES = {'PreSubmitted', 'Submitted', 'Filled', 'Cancelled', 'ApiCancelled', 'Inactive'}
+    CANCEL_STATES = {'Cancelled', 'ApiCancelled', 'Filled', 'Inactive'}
+
+    def __init__(self, settings, notifier=None, ack_timeout=5.0, reconcile_interval=30.0,
+                 square_off_timeout=30.0, broker=None, data_broker=None, endpoints=None, client_id=1,
+                 data_client_id=None, health_interval=10.0, backoff_initial=1.0, backoff_max=60.0,
+                 tick_store=None, market_data_lines=100, tick_intervals=None, journal=None, mes_roll_days=8):
+        # ib_insync.IB clients, or anything exposing the same surface. Orders go through
+        # order_ib; market data, positions, portfolio and PnL through ib. A single
+        # broker object passed alone serves both roles over one connection.
+        self.order_ib = broker or IB()
+        self.ib = data_broker or (broker if broker is not None else IB())
+        self.pool = ConnectionPool(
+            {'orders': self.order_ib, 'data': self.ib},
+            endpoints or [('ib-gateway', 4001)],
+            {'orders': client_id, 'data': data_client_id or client_id + 1},
+            health_interval=health_interval,
+            backoff_initial=backoff_initial,
+            backoff_max=backoff_max,
+            on_connected=self.on_reconnected,
+            on_state_change=lambda: self.mark_changed('connection')
+        )
+        self.callbacks_registered = False
         self.settings = settings
-        self.market_data_tickers = {}
+        self.notifier = notifier or ChangeNotifier()
+        self.ack_timeout = ack_timeout  # Seconds to wait for the broker to acknowledge
+        self.square_off_timeout = square_off_timeout  # Seconds to wait for square-off fills
+        self.last_square_off = None
+        self.square_off_pending = False  # The last square-off left positions open, retried on reconnect
+        self.square_off_orders = []  # orderIds placed by the last square-off
+        self.journal = journal  # Optional append-only record of signals, orders, fills, positions and PnL
+        self.orders = OrderStore(on_transition=self.journal_order)  # Every order this session with its state transitions
+        self.connect_count = 0
+        self.market_data = MarketDataManager(
+            self.ib, max_lines=market_data_lines,
+            # History for a contract nobody watches any more is dropped with its line
+            on_cancel=lambda contract: self.tick_store.remove(self.tick_store.symbol_of(contract))
+        )
+        self.spy_contract = None
+        self.mes_contract = None  # Front month currently subscribed
+        self.candidates = {}  # right -> N-OTM option contract subscribed ahead of signals
         self.pnl = None
-        self.current_pnl = {
-            'dailyPnL': 0.0,
-            'unrealizedPnL': 0.0,
-            'realizedPnL': 0.0,
-            'totalPnL': 0.0
-        }
-        self.open_orders = {}
-        self.positions = {}  # Store positions with conId as key
+        self.current_pnl = PnLRecord()
+        self.open_orders = {}  # orderId -> OrderRecord
+        self.positions = {}  # conId -> PositionRecord
+        self.position_index = PositionIndex()  # Same positions, bucketed for exit matching
         self.current_spy_price = 598.0  # Set default price to 598
+        self.tick_store = tick_store or TickStore()  # Recent ticks and bars for every subscribed symbol
+        # Ticks are conflated per contract, each consumer reads at its own rate (seconds between runs)
+        tick_intervals = tick_intervals or {}
+        self.ticks = TickConflator()
+        self.ticks.add_consumer('price', self.market_data_monitor, tick_intervals.get('price', 0.0))
+        self.ticks.add_consumer('bars', self.record_ticks, tick_intervals.get('bars', 0.0))
+        # Bumped on every change so encoded API responses can be cached per version
+        self.versions = dict.fromkeys(('positions', 'orders', 'pnl', 'spy_price', 'connection'), 0)
+        self.contract_cache = ContractCache(self.ib, roll_days=mes_roll_days)
+        self.option_chain = OptionChain(self.ib)
+        self.reconciler = Reconciler(self, interval=reconcile_interval)
         
     async def connect(self):
+        # Order entry and market data clients, each on the first endpoint that answers
         try:
-            await self.ib.connectAsync('ib-gateway', 4001, clientId=1)
-            # Try to connect with a fixed client ID first
-            try:
-                await self.ib.connectAsync('127.0.0.1', 7497, clientId=1)
-            except Exception as e:
-                if "already in use" in str(e).lower():
-                    # If client ID is in use, try with a random one
-                    client_id = random.randint(100, 999)
-                    print(f"Client ID 1 in use, trying with {client_id}")
-                    await self.ib.connectAsync('127.0.0.1', 7497, clientId=client_id)
-                else:
-                    raise
+            await self.pool.connect()
+        except ConnectionError as e:
+            # The pool's supervisor keeps retrying and starts the session once connected
+            log.error(f"Failed to connect to IB: {e}")
+            return
+        await self.start_session()
 
+    async def start_session(self):
+        """Subscribe and load the initial state once both clients are connected"""
+        try:
             # Set delayed market data type BEFORE any market data requests
             self.ib.reqMarketDataType(4)  # 4 = Delayed, 1 = Live
             await asyncio.sleep(1)  # Give time for the market data type to be set
-            print("Successfully connected to IB and set to delayed market data")
+            log.info("Successfully connected to IB and set to delayed market data")
+            self.connect_count += 1
+            if self.connect_count > 1:
+                RECONNECTS.inc()
             
             # Register all callbacks
-            self.ib.openOrderEvent += self.order_status_monitor
-            self.ib.positionEvent += self.position_monitor
-            self.ib.updatePortfolioEvent += self.portfolio_monitor
-            self.ib.pendingTickersEvent += self.market_data_monitor
+            self.register_callbacks()
+            self.ticks.start()
             
             # Initialize SPY market data
             await self.initialize_spy_market_data()
+
+            # Load the SPY chain once per session for strike selection
+            await self.load_option_chain()
+
+            # Qualify the contracts signals trade so the signal path is a cache lookup
+            await self.warm_contract_cache()
             
             # Get initial positions
-            print("Getting initial positions...")
+            log.info("Getting initial positions...")
             positions = self.ib.positions()
             for position in positions:
                 self.position_monitor(position)
                 
             # Get initial open orders
-            print("Getting initial orders...")
-            trades = self.ib.trades()
+            log.info("Getting initial orders...")
+            trades = self.order_ib.trades()
             for trade in trades:
                 self.order_status_monitor(trade)
                 
             # Get initial portfolio updates for positions
-            print("Getting initial portfolio data...")
+            log.info("Getting initial portfolio data...")
             portfolio = self.ib.portfolio()
             for item in portfolio:
                 self.portfolio_monitor(item)
@@ -72,137 +144,304 @@ class IBHandler:
             # Subscribe to PnL
             await self.subscribe_to_pnl()
             
-            print("Initial data sync complete")
+            log.info("Initial data sync complete")
             
         except Exception as e:
-            print(f"Failed to connect to IB: {e}")
+            log.error(f"Failed to start IB session: {e}")
             raise
 
+    def register_callbacks(self):
+        """Attach event handlers once; they survive reconnects of the same client"""
+        if self.callbacks_registered:
+            return
+        self.order_ib.openOrderEvent += self.order_status_monitor
+        self.order_ib.orderStatusEvent += self.order_status_monitor
+        self.order_ib.execDetailsEvent += self.fill_monitor
+        self.ib.positionEvent += self.position_monitor
+        self.ib.updatePortfolioEvent += self.portfolio_monitor
+        self.ib.pendingTickersEvent += self.ticks.on_tickers
+        self.ib.pnlEvent += self.pnl_callback
+        self.callbacks_registered = True
+
+    def unregister_callbacks(self):
+        if not self.callbacks_registered:
+            return
+        self.order_ib.openOrderEvent -= self.order_status_monitor
+        self.order_ib.orderStatusEvent -= self.order_status_monitor
+        self.order_ib.execDetailsEvent -= self.fill_monitor
+        self.ib.positionEvent -= self.position_monitor
+        self.ib.updatePortfolioEvent -= self.portfolio_monitor
+        self.ib.pendingTickersEvent -= self.ticks.on_tickers
+        self.ib.pnlEvent -= self.pnl_callback
+        self.callbacks_registered = False
+
+    async def on_reconnected(self, connection):
+        """Restore what a client loses on reconnect: market data lines, PnL, then reconcile"""
+        if self.connect_count == 0:
+            # IB was unreachable at startup, run the full initial sync instead
+            if self.pool.is_connected():
+                await self.start_session()
+            return
+        self.connect_count += 1
+        RECONNECTS.inc()
+        if 'data' in connection.roles:
+            self.ib.reqMarketDataType(4)
+            self.market_data.resubscribe()
+            self.pnl = None
+            await self.subscribe_to_pnl()
+        # ib_insync re-requests positions and open orders on connect, diff them against local state.
+        # A client that is still down has an empty cache, which would read as everything closed,
+        # so the reconcile waits for whichever client reconnects last.
+        if self.pool.is_connected():
+            self.reconciler.reconcile()
+            # A square-off attempted while the order client was down is retried until the close
+            if self.square_off_pending and market_calendar.in_square_off_window():
+                asyncio.ensure_future(self.retry_square_off())
+
+    def connection_state(self):
+        """Whether the state served to clients is live or the last known before a disconnect"""
+        down_since = self.pool.down_since()
+        return {"connected": down_since is None, "stale": down_since is not None, "since": down_since}
+
     async def initialize_spy_market_data(self):
         """Initialize SPY market data subscription"""
         try:
-            if 'SPY' not in self.market_data_tickers:  # Only initialize if not already done
+            if self.spy_ticker() is None:  # Only initialize if not already done
                 self.ib.reqMarketDataType(4)  # Ensure delayed data
                 await asyncio.sleep(0.1)
                 
                 spy = Stock(symbol='SPY', exchange='SMART', currency='USD')
                 qualified = await self.ib.qualifyContractsAsync(spy)
                 if qualified:
-                    self.market_data_tickers['SPY'] = self.ib.reqMktData(qualified[0])
-                    print("Successfully subscribed to SPY delayed market data")
+                    self.spy_contract = qualified[0]
+                    if self.market_data.subscribe(self.spy_contract, 'spy') is None:
+                        # Every line is held, SPY price and the ATM strike would never update
+                        log.error("Could not subscribe to SPY market data: market data line limit reached",
+                                  extra={'fields': {'lines': len(self.market_data.lines)}})
+                        return
+                    log.info("Successfully subscribed to SPY delayed market data")
                     await asyncio.sleep(1)  # Give time for initial data
         except Exception as e:
-            print(f"Error initializing SPY market data: {e}")
+            log.error(f"Error initializing SPY market data: {e}")
+
+    def spy_ticker(self):
+        return self.market_data.ticker(self.spy_contract.conId) if self.spy_contract else None
+
+    async def load_option_chain(self):
+        """Fetch the SPY option chain and seed the ATM index from the current price"""
+        try:
+            spy = self.spy_contract
+            if not spy:
+                qualified = await self.ib.qualifyContractsAsync(Stock('SPY', 'SMART', 'USD'))
+                spy = qualified[0]
+
+            expirations = await self.option_chain.load(spy)
+            expiry = self.get_option_expiry()
+            await self.load_expiry_strikes(expiry)
+            self.option_chain.set_expiry(expiry)
+            self.option_chain.update_price(self.current_spy_price)
+            log.info(f"Loaded SPY option chain: {expirations} expirations, ATM strike {self.option_chain.atm_strike()}")
+        except Exception as e:
+            log.error(f"Error loading SPY option chain: {e}")
+
+    async def load_expiry_strikes(self, expiry):
+        """Index the strikes listed for expiry and cache its contracts, once per session"""
+        contracts = await self.option_chain.load_expiry(expiry)
+        for contract in contracts:
+            self.contract_cache.put(contract)
+        return len(contracts)
 
     def market_data_monitor(self, tickers):
-        """Monitor market data updates"""
+        """Track the SPY price and ATM strike from the latest conflated tickers"""
         try:
             for ticker in tickers:
-                if ticker.contract.symbol == 'SPY':
+                # Option legs share the SPY symbol, only the underlying moves the price
+                if ticker.contract.symbol == 'SPY' and ticker.contract.secType == 'STK':
                     price = ticker.marketPrice() or ticker.last or ticker.close or 598.0
                     if price and price > 0:
-                        self.current_spy_price = float(price)
-                        print(f"Updated SPY price: {self.current_spy_price}")
+                        self.set_spy_price(price)
+                        tick_log.info("SPY price update", extra={'fields': {'symbol': 'SPY', 'price': self.current_spy_price}})
+                        if self.option_chain.update_price(self.current_spy_price):
+                            self.prefetch_otm_contracts()
         except Exception as e:
-            print(f"Error in market data monitor: {e}")
+            tick_log.error(f"Error in market data monitor: {e}")
+
+    def record_ticks(self, tickers):
+        lines = self.market_data.lines
+        for ticker in tickers:
+            # A ticker still pending when its line closed must not bring back the history just dropped
+            if ticker.contract.conId in lines:
+                self.tick_store.record_ticker(ticker)
+
+    def mark_changed(self, kind):
+        """Advance the version of kind and wake the WebSocket producer"""
+        self.versions[kind] += 1
+        self.notifier.notify(kind)
+
+    def set_spy_price(self, price):
+        price = float(price)
+        if price != self.current_spy_price:
+            self.current_spy_price = price
+            self.versions['spy_price'] += 1  # Not pushed over WebSocket, no notify
+
+    def encoded_positions(self):
+        return join_array([record.encoded() for record in self.positions.values()])
+
+    def encoded_orders(self):
+        return join_array([record.encoded() for record in self.open_orders.values()])
+
+    def prefetch_otm_contracts(self):
+        """Qualify and watch the current N-OTM call/put in the background so signals hit the cache"""
+        expiry = self.option_chain.expiry
+        for right in ('C', 'P'):
+            strike = self.option_chain.otm_strike(right, self.settings.otm_strikes)
+            if not strike:
+                continue
+            contract = self.contract_cache.get('SPY', expiry, strike, right)
+            if contract:
+                self.watch_candidate(right, contract)
+            else:
+                asyncio.ensure_future(self.resolve_candidate(right, self.make_spy_option(expiry, strike, right)))
+
+    async def resolve_candidate(self, right, option):
+        contract = await self.contract_cache.resolve(option)
+        if contract:
+            self.watch_candidate(right, contract)
+
+    def watch_candidate(self, right, contract):
+        """Keep a line on the strike a signal would trade; the previous one goes idle"""
+        previous = self.candidates.get(right)
+        if previous is not None and previous.conId == contract.conId:
+            return
+        if previous is not None:
+            self.market_data.release(previous.conId, 'candidate')
+        if self.market_data.subscribe(contract, 'candidate') is not None:
+            self.candidates[right] = contract
+        else:
+            self.candidates.pop(right, None)
+
+    def watch_mes(self, contract):
+        """Hold a line on the MES front month, releasing the old month after a roll"""
+        if self.mes_contract is not None and self.mes_contract.conId == contract.conId:
+            return
+        if self.mes_contract is not None:
+            self.market_data.release(self.mes_contract.conId, 'mes', cancel=True)
+        self.mes_contract = contract if self.market_data.subscribe(contract, 'mes') is not None else None
+
+    def market_data_contract(self, contract):
+        """Position contracts may lack an exchange, prefer the qualified one from the cache"""
+        cached = self.contract_cache.contracts.get(self.contract_cache.key_for(contract))
+        if cached is not None and cached.conId == contract.conId:
+            return cached
+        if not contract.exchange:
+            contract = copy.copy(contract)
+            contract.exchange = 'CME' if contract.secType == 'FUT' else 'SMART'
+        return contract
 
     def order_status_monitor(self, trade):
         try:
             order = trade.order
             status = trade.orderStatus
             contract = trade.contract
-            
+
+            self.orders.update(trade)
+
             # Track all orders initially, remove only when fully processed
-            self.open_orders[order.orderId] = {
-                'orderId': order.orderId,
-                'contract': {
-                    'localSymbol': contract.localSymbol,
-                    'secType': contract.secType,
-                },
-                'action': order.action,
-                'totalQuantity': order.totalQuantity,
-                'orderType': order.orderType,
-                'status': status.status,
-                'filled': status.filled,
-                'remaining': status.remaining,
-                'avgFillPrice': status.avgFillPrice or 0.0,
-                'errorMessage': getattr(trade, 'errorMessage', '')  # Add error message if exists
-            }
-            
-            # Only remove orders that are fully processed and complete
+            record = self.open_orders.get(order.orderId)
             if status.status in ['Filled', 'Cancelled', 'Inactive'] and status.remaining == 0:
-                self.open_orders.pop(order.orderId, None)
+                changed = self.open_orders.pop(order.orderId, None) is not None
+            elif record is None:
+                self.open_orders[order.orderId] = OrderRecord(trade)
+                changed = True
+            else:
+                changed = record.update(trade)
+            if changed:
+                self.mark_changed('orders')
                 
-            print(f'\nOrder Update - {contract.symbol}:')
-            print(f'Order ID: {order.orderId}, Status: {status.status}')
-            print(f'Filled: {status.filled}, Remaining: {status.remaining}')
+            if order_log.isEnabledFor(logging.INFO):
+                order_log.info("Order update", extra={'fields': {
+                    'symbol': contract.symbol,
+                    'orderId': order.orderId,
+                    'status': status.status,
+                    'filled': status.filled,
+                    'remaining': status.remaining
+                }})
             if hasattr(trade, 'log'):
                 for entry in trade.log:
                     if entry.errorCode:
-                        print(f'Error {entry.errorCode}: {entry.message}')
+                        order_log.warning("Order error", extra={'fields': {
+                            'orderId': order.orderId, 'errorCode': entry.errorCode, 'error': entry.message
+                        }})
             
         except Exception as e:
-            print(f"Error in order status monitor: {e}")
+            order_log.error(f"Error in order status monitor: {e}")
 
     def position_monitor(self, position):
         try:
-            if position.position != 0:  # Only track non-zero positions
-                self.positions[position.contract.conId] = {
-                    'contract': {
-                        'conId': position.contract.conId,
-                        'localSymbol': position.contract.localSymbol,
-                        'secType': position.contract.secType,
-                        'exchange': position.contract.exchange,
-                    },
-                    'position': position.position,
-                    'avgCost': float(position.avgCost),
-                    'marketPrice': 0.0,  # Will be updated by portfolio_monitor
-                    'unrealizedPNL': 0.0  # Will be updated by portfolio_monitor
-                }
+            self.position_index.update(position)
+            con_id = position.contract.conId
+            record = self.positions.get(con_id)
+            if position.position == 0:  # Only track non-zero positions
+                changed = self.positions.pop(con_id, None) is not None
+                # Closed positions no longer need their market data line
+                self.market_data.release(con_id, 'position', cancel=True)
+            elif record is None:
+                self.positions[con_id] = PositionRecord(position.contract, position.position, position.avgCost)
+                self.market_data.subscribe(self.market_data_contract(position.contract), 'position')
+                changed = True
             else:
-                # Remove closed positions
-                self.positions.pop(position.contract.conId, None)
+                changed = record.update_position(position.position, position.avgCost)
+            if changed:
+                self.mark_changed('positions')
+                if self.journal:
+                    contract = position.contract
+                    self.journal.record('position', {
+                        'conId': con_id, 'position': position.position, 'avgCost': position.avgCost
+                    }, symbol=contract.symbol, local_symbol=contract.localSymbol, ref=con_id)
                 
-            print(f'\nPosition Update - {position.contract.localSymbol}:')
-            print(f'Position: {position.position}, Avg Cost: {position.avgCost}')
+            if position_log.isEnabledFor(logging.INFO):
+                position_log.info("Position update", extra={'fields': {
+                    'localSymbol': position.contract.localSymbol,
+                    'position': position.position,
+                    'avgCost': position.avgCost
+                }})
             
         except Exception as e:
-            print(f"Error in position monitor: {e}")
+            position_log.error(f"Error in position monitor: {e}")
 
     def portfolio_monitor(self, item):
         try:
-            if item.contract.conId in self.positions:
-                self.positions[item.contract.conId].update({
-                    'marketPrice': float(item.marketPrice),
-                    'unrealizedPNL': float(item.unrealizedPNL)
-                })
+            record = self.positions.get(item.contract.conId)
+            if record is not None and record.update_market(item.marketPrice, item.unrealizedPNL):
+                self.mark_changed('positions')
                 
-            print(f'\nPortfolio Update - {item.contract.localSymbol}:')
-            print(f'Market Price: {item.marketPrice}, Unrealized PNL: {item.unrealizedPNL}')
+            if position_log.isEnabledFor(logging.DEBUG):
+                position_log.debug("Portfolio update", extra={'fields': {
+                    'localSymbol': item.contract.localSymbol,
+                    'marketPrice': item.marketPrice,
+                    'unrealizedPNL': item.unrealizedPNL
+                }})
             
         except Exception as e:
-            print(f"Error in portfolio monitor: {e}")
+            position_log.error(f"Error in portfolio monitor: {e}")
 
     async def get_orders(self):
         """Return only open orders"""
-        return list(self.open_orders.values())
+        return [record.to_dict() for record in self.open_orders.values()]
 
     async def disconnect(self):
         """Async disconnect to handle cleanup properly"""
         try:
             # Only attempt cleanup if still connected
-            if not self.ib.isConnected():
+            if not self.ib.isConnected() and not self.order_ib.isConnected():
                 return
 
             # First unregister all callbacks
             try:
-                self.ib.openOrderEvent -= self.order_status_monitor
-                self.ib.positionEvent -= self.position_monitor
-                self.ib.updatePortfolioEvent -= self.portfolio_monitor
-                if self.pnl:
-                    self.ib.pnlEvent -= self.pnl_callback
+                self.unregister_callbacks()
+                self.ticks.stop()
             except Exception as e:
-                print(f"Error unregistering callbacks: {e}")
+                log.error(f"Error unregistering callbacks: {e}")
 
             # Then cancel PnL subscription
             try:
@@ -210,23 +449,19 @@ class IBHandler:
                     self.ib.cancelPnL(self.pnl.account, self.pnl.modelCode)
                     self.pnl = None
             except Exception as e:
-                print(f"Error canceling PnL subscription: {e}")
+                log.error(f"Error canceling PnL subscription: {e}")
 
             # Cancel market data subscriptions if any exist
             try:
-                for ticker in list(self.market_data_tickers.values()):
-                    if hasattr(ticker, 'contract'):
-                        self.ib.cancelMktData(ticker.contract)
-                        await asyncio.sleep(0.1)  # Give time for cancellation to process
-                self.market_data_tickers.clear()
+                self.market_data.cancel_all()
             except Exception as e:
-                print(f"Error clearing market data tickers: {e}")
+                log.error(f"Error clearing market data tickers: {e}")
 
             # Finally disconnect
-            self.ib.disconnect()
+            self.pool.disconnect()
 
         except Exception as e:
-            print(f"Error during disconnect: {e}")
+            log.error(f"Error during disconnect: {e}")
 
     async def subscribe_to_pnl(self):
         try:
@@ -234,306 +469,549 @@ class IBHandler:
             account = self.ib.managedAccounts()[0]
             # Subscribe to PnL updates
             self.pnl = self.ib.reqPnL(account)
-            # Register callback using pnlEvent instead of updateEvent
-            self.ib.pnlEvent += self.pnl_callback
-            print(f"Successfully subscribed to PnL for account {account}")
+            log.info(f"Successfully subscribed to PnL for account {account}")
         except Exception as e:
-            print(f"Error subscribing to PnL: {e}")
+            log.error(f"Error subscribing to PnL: {e}")
 
     def pnl_callback(self, pnl):
         try:
-            self.current_pnl = {
-                'dailyPnL': float(pnl.dailyPnL or 0),
-                'unrealizedPnL': float(pnl.unrealizedPnL or 0),
-                'realizedPnL': float(pnl.realizedPnL or 0),
-                'totalPnL': float((pnl.unrealizedPnL or 0) + (pnl.realizedPnL or 0))
-            }
+            if self.current_pnl.update(pnl):
+                self.mark_changed('pnl')
+                if self.journal:
+                    self.journal.record('pnl', self.current_pnl.to_dict())
         except Exception as e:
-            print(f"Error in PnL callback: {e}")
+            position_log.error(f"Error in PnL callback: {e}")
+
+    def fill_monitor(self, trade, fill):
+        if not self.journal:
+            return
+        try:
+            execution = fill.execution
+            self.journal.record('fill', {
+                'execId': execution.execId,
+                'orderId': execution.orderId,
+                'permId': execution.permId,
+                'conId': fill.contract.conId,
+                'side': execution.side,
+                'shares': execution.shares,
+                'price': execution.price,
+                'cumQty': execution.cumQty,
+                'avgPrice': execution.avgPrice
+            }, symbol=fill.contract.symbol, local_symbol=fill.contract.localSymbol, ref=execution.execId,
+               ts=fill.time.timestamp() if fill.time else None)
+        except Exception as e:
+            order_log.error(f"Error journaling fill: {e}")
+
+    def journal_order(self, lifecycle, state):
+        """OrderStore transition hook: one journal entry per order state change"""
+        if not self.journal:
+            return
+        trade = lifecycle.trade
+        status = trade.orderStatus
+        self.journal.record('order', {
+            'orderId': lifecycle.order_id,
+            'permId': lifecycle.perm_id,
+            'state': state,
+            'action': lifecycle.action,
+            'totalQuantity': lifecycle.quantity,
+            'orderType': trade.order.orderType,
+            'filled': status.filled,
+            'remaining': status.remaining,
+            'avgFillPrice': status.avgFillPrice
+        }, symbol=trade.contract.symbol, local_symbol=lifecycle.local_symbol, ref=lifecycle.order_id)
+
+    def journal_signal(self, signal, result):
+        if self.journal:
+            self.journal.record('signal', {'signal': signal, 'result': result},
+                                symbol=str(signal.get('symbol', '')) or None)
 
     async def get_pnl(self):
-        return self.current_pnl
+        return self.current_pnl.to_dict()
 
     async def get_spy_price(self):
         """Return current SPY price"""
         try:
-            if 'SPY' not in self.market_data_tickers:
+            ticker = self.spy_ticker()
+            if ticker is None:
                 await self.initialize_spy_market_data()
+                ticker = self.spy_ticker()
             
-            ticker = self.market_data_tickers.get('SPY')
             if ticker:
                 price = ticker.marketPrice() or ticker.last or ticker.close or 598.0
                 if price and price > 0:
-                    self.current_spy_price = float(price)
+                    self.set_spy_price(price)
             
             return self.current_spy_price  # Will return 598.0 if no other price is available
         except Exception as e:
-            print(f"Error getting SPY price: {e}")
+            log.error(f"Error getting SPY price: {e}")
             return 598.0  # Return 598 on error
 
+    def get_option_expiry(self):
+        """Return the option expiry (YYYYMMDD) selected by the dte setting"""
+        today = datetime.now()
+        expiry = today if self.settings.dte == 0 else today + timedelta(days=1)
+        return expiry.strftime('%Y%m%d')
+
+    async def warm_contract_cache(self):
+        """Evict expired contracts and pre-qualify MES futures and configured SPY options"""
+        try:
+            evicted = self.contract_cache.evict_expired()
+            months = await self.contract_cache.warm_futures(
+                Future('MES', exchange='CME', currency='USD')
+            )
+
+            expiry = self.get_option_expiry()
+            if expiry not in self.option_chain.strikes:
+                await self.load_expiry_strikes(expiry)
+            for right in ('C', 'P'):
+                strike = self.select_strike(right, expiry)
+                if strike:
+                    await self.resolve_candidate(right, self.make_spy_option(expiry, strike, right))
+
+            front = self.contract_cache.front_month('MES')
+            if front:
+                self.watch_mes(front)
+            log.info("Contract cache warmed", extra={'fields': {
+                'mesMonths': months,
+                'contracts': len(self.contract_cache.contracts),
+                'evicted': evicted,
+                'mesFrontMonth': front.localSymbol if front else None
+            }})
+        except Exception as e:
+            log.error(f"Error warming contract cache: {e}")
+
+    async def contract_cache_task(self):
+        """Re-warm the contract cache at every market open"""
+        while True:
+            try:
+                await self.sleep_until(market_calendar.next_open())
+                await self.load_option_chain()
+                await self.warm_contract_cache()
+            except Exception as e:
+                log.error(f"Error in contract cache task: {e}")
+                await asyncio.sleep(60)
+
     async def get_mes_contract(self):
         try:
-            # Specify MES future contract
-            contract = Future('MES', exchange='CME', currency='USD')
-            # contracts = await self.ib.qualifyContractsAsync(contract)
-            contracts = await self.ib.reqContractDetailsAsync(contract)
-            # print(contracts)
-            # if not contracts:
-            #     print("No MES contracts found")
-            #     return None
-                
-            # Simply take the first contract (front month)
-            mes_contract = contracts[0].contract
-            # print(mes_contract)
-            # print(f"Selected MES contract: {mes_contract.localSymbol} (Expiry: {mes_contract.lastTradeDateOrContractMonth})")
-            mes_contract = await self.ib.qualifyContractsAsync(mes_contract)
-            # print(mes_contract)
+            # Front month rolls automatically once the current month enters the roll window
+            mes_contract = self.contract_cache.front_month('MES')
+            if not mes_contract:
+                await self.contract_cache.warm_futures(Future('MES', exchange='CME', currency='USD'))
+                mes_contract = self.contract_cache.front_month('MES')
             return mes_contract
         except Exception as e:
-            print(f"Error getting MES contract: {e}")
+            signal_log.error(f"Error getting MES contract: {e}")
             return None
 
+    def make_spy_option(self, expiry, strike, right):
+        return Option(
+            symbol='SPY',
+            lastTradeDateOrContractMonth=expiry,
+            strike=strike,
+            right=right,
+            exchange='SMART',
+            currency='USD',
+            multiplier='100'
+        )
+
+    def select_strike(self, right, expiry):
+        """Use the fixed strike from settings, otherwise the strike otm_strikes away from ATM"""
+        strike = self.settings.call_strike if right == 'C' else self.settings.put_strike
+        if strike:
+            return strike
+        if expiry != self.option_chain.expiry:
+            self.option_chain.set_expiry(expiry)
+        return self.option_chain.otm_strike(right, self.settings.otm_strikes)
+
     async def get_spy_option(self, action=None, expiry=None):
         try:
-            if 'Buy' in action:
-                right = 'C'
-                strike = self.settings.call_strike
-            else:
-                right = 'P'
-                strike = self.settings.put_strike
+            right = 'C' if 'Buy' in action else 'P'
 
             if not expiry:
-                today = datetime.now()
-                expiry = today if self.settings.dte == 0 else today + timedelta(days=1)
-                expiry = expiry.strftime('%Y%m%d')
+                expiry = self.get_option_expiry()
+            if expiry not in self.option_chain.strikes:
+                # e.g. the dte setting changed since the chain was loaded
+                await self.load_expiry_strikes(expiry)
 
-            print(f"Creating SPY option: Strike={strike}, Right={right}, Expiry={expiry}")
-            
-            # Properly specify the option contract
-            contract = Option(
-                symbol='SPY',
-                lastTradeDateOrContractMonth=expiry,
-                strike=strike,
-                right=right,
-                exchange='SMART',
-                currency='USD',
-                multiplier='100'
-            )
-            
-            # First get contract details to ensure we have the correct contract
-            details = await self.ib.reqContractDetailsAsync(contract)
-            if not details:
-                print("No contract details found")
+            strike = self.select_strike(right, expiry)
+            if not strike:
+                signal_log.warning(f"No strike available for SPY {right} expiring {expiry}")
                 return None
-                
-            # Use the first contract from details
-            contract = details[0].contract
-            print(f"Using contract: {contract}")
+
+            # Served from memory when warmed, otherwise fetched once and cached
+            contract = self.contract_cache.get('SPY', expiry, strike, right)
+            if not contract:
+                signal_log.warning(f"Contract cache miss for SPY option: Strike={strike}, Right={right}, Expiry={expiry}")
+                contract = await self.contract_cache.resolve(self.make_spy_option(expiry, strike, right))
+            if not contract:
+                signal_log.warning("No contract details found")
+                return None
+
             return contract
             
         except Exception as e:
-            print(f"Error getting SPY option: {e}")
+            signal_log.error(f"Error getting SPY option: {e}")
             return None
 
     async def get_positions(self):
         """Return list of current positions"""
-        return list(self.positions.values())
+        return [record.to_dict() for record in self.positions.values()]
 
-    async def process_signal(self, signal):
-        try:
-            symbol = signal['symbol']
-            action = signal['action']
-            print(f"Processing signal: {symbol} {action}")
-            
-            # Handle exit orders
-            if 'Exit' in action:
-                positions = self.ib.positions()
-                print("Current positions:", positions)
-                position_found = None
-                
-                # Find matching position
-                for pos in positions:
-                    if 'MES' in symbol and pos.contract.symbol == 'MES':
-                        position_found = pos
-                        break
-                    elif 'SPY' in symbol and pos.contract.symbol == 'SPY':
-                        # For SPY, only look for option positions
-                        if pos.contract.secType == 'OPT':
-                            is_long = pos.position > 0
-                            is_call = pos.contract.right == 'C'
-                            if ('Buy' in action and is_long and is_call) or \
-                               ('Sell' in action and is_long and not is_call):
-                                position_found = pos
-                                break
-                
-                if not position_found:
-                    return {
-                        "status": "error", 
-                        "message": f"No matching open position found for {symbol}"
-                    }
-                
-                print(f"Closing position: {position_found.contract}")
-                # Place exit order with exchange specified
-                exit_action = 'SELL' if position_found.position > 0 else 'BUY'
-                order = MarketOrder(
-                    action=exit_action,
-                    totalQuantity=abs(position_found.position)
-                )
-                trade = self.ib.placeOrder(position_found.contract, order)
-                
-                return {"status": "success", "order_id": trade.order.orderId}
-            
-            # Handle new position orders
+    async def prepare_signal(self, signal):
+        """Resolve what signal should trade without placing anything
+
+        Returns (legs, error): legs is a list of (contract, order) pairs, error a
+        message when the signal cannot be traded.
+        """
+        symbol = signal['symbol']
+        action = signal['action']
+
+        # Handle exit orders
+        if 'Exit' in action:
+            # "Buy Exit" closes what a Buy opened, "Sell Exit" what a Sell opened
             if 'MES' in symbol:
-                # For futures, we can directly use Buy/Sell as given
-                contracts = await self.get_mes_contract()
-                if not contracts or len(contracts) == 0:
-                    return {"status": "error", "message": "Could not qualify MES contract"}
-                contract = contracts[0]
-                order_action = 'BUY' if 'Buy' in action else 'SELL'
+                key = ('MES', 'FUT', '', 'LONG' if 'Buy' in action else 'SHORT')
             elif 'SPY' in symbol:
-                # For SPY, we only trade options:
-                # If action is "Buy" -> Buy Call option
-                # If action is "Sell" -> Buy Put option
-                is_buy_signal = 'Buy' in action
-                contract = await self.get_spy_option(
-                    action='Buy' if is_buy_signal else 'Sell'  # This determines call/put selection
-                )
-                if not contract:
-                    return {"status": "error", "message": "Could not qualify SPY option contract"}
-                
-                # Verify it's an option contract
-                if contract.secType != 'OPT':
-                    return {"status": "error", "message": "SPY signals must be for options only"}
-                
-                order_action = 'BUY'  # Always buy options, we use calls/puts for direction
+                # SPY signals only ever buy options: calls for Buy, puts for Sell
+                key = ('SPY', 'OPT', 'C' if 'Buy' in action else 'P', 'LONG')
             else:
-                return {"status": "error", "message": "Unsupported symbol"}
-            
+                return None, "Unsupported symbol"
+
+            positions = self.position_index.match(*key, policy=self.settings.exit_policy)
+            if not positions:
+                return None, f"No matching open position found for {symbol}"
+            for position in positions:
+                signal_log.info(f"Closing position: {position.contract}")
+            return [self.close_order(position) for position in positions], None
+
+        # Handle new position orders; resolve latency counts failed lookups too, they are often the slow ones
+        resolve_started = time_lib.perf_counter()
+        if 'MES' in symbol:
+            # For futures, we can directly use Buy/Sell as given
+            contract = await self.get_mes_contract()
+            CONTRACT_RESOLVE_LATENCY.observe(time_lib.perf_counter() - resolve_started)
             if not contract:
-                return {"status": "error", "message": "Could not qualify contract"}
-            
-            print(f"Placing order: {order_action} {contract.localSymbol}")    
-            order = MarketOrder(order_action, self.settings.quantity)
-            trade = self.ib.placeOrder(contract, order)
-            
-            return {"status": "success", "order_id": trade.order.orderId}
-            
+                return None, "Could not qualify MES contract"
+            order_action = 'BUY' if 'Buy' in action else 'SELL'
+        elif 'SPY' in symbol:
+            # For SPY, we only trade options:
+            # If action is "Buy" -> Buy Call option
+            # If action is "Sell" -> Buy Put option
+            is_buy_signal = 'Buy' in action
+            contract = await self.get_spy_option(
+                action='Buy' if is_buy_signal else 'Sell'  # This determines call/put selection
+            )
+            CONTRACT_RESOLVE_LATENCY.observe(time_lib.perf_counter() - resolve_started)
+            if not contract:
+                return None, "Could not qualify SPY option contract"
+
+            # Verify it's an option contract
+            if contract.secType != 'OPT':
+                return None, "SPY signals must be for options only"
+
+            order_action = 'BUY'  # Always buy options, we use calls/puts for direction
+        else:
+            return None, "Unsupported symbol"
+
+        signal_log.info(f"Placing order: {order_action} {contract.localSymbol}")
+        return [(contract, MarketOrder(order_action, self.settings.quantity))], None
+
+    async def process_signal(self, signal, received_at=None):
+        result = await self.execute_signal(signal, received_at)
+        self.journal_signal(signal, result)
+        return result
+
+    async def execute_signal(self, signal, received_at=None):
+        received_at = received_at or time_lib.perf_counter()
+        try:
+            signal_log.info(f"Processing signal: {signal['symbol']} {signal['action']}")
+            legs, error = await self.prepare_signal(signal)
+            if error:
+                return {"status": "error", "message": error}
+
+            trades = [self.place_order(contract, order) for contract, order in legs]
+            SIGNAL_LATENCY.observe(time_lib.perf_counter() - received_at)
+
+            result = {"status": "success", "order_id": trades[0].order.orderId}
+            if 'Exit' in signal['action']:
+                result["order_ids"] = [trade.order.orderId for trade in trades]
+            return result
+
         except Exception as e:
-            print(f"Error processing signal: {e}")
+            signal_log.error(f"Error processing signal: {e}")
             return {"status": "error", "message": str(e)}
 
-    def _clean_message(self, message):
-        """Clean numeric values in message"""
-        def clean_value(v):
-            if isinstance(v, (int, float)):
-                if math.isnan(v) or math.isinf(v):
-                    return 0.0
-                return float(v)
-            elif isinstance(v, dict):
-                return {k: clean_value(val) for k, val in v.items()}
-            elif isinstance(v, list):
-                return [clean_value(item) for item in v]
-            return v
-            
-        return clean_value(message)
+    async def process_signals(self, signals, received_at=None, wait_ack=True):
+        """Trade a batch of signals: resolve every contract concurrently, then place all orders back to back
+
+        Contract lookups for the whole batch overlap, so the batch costs about one
+        resolve round trip instead of one per signal, and no order waits on another
+        signal's lookup. With wait_ack the acknowledgements are awaited together.
+        """
+        received_at = received_at or time_lib.perf_counter()
+        signal_log.info("Processing signal batch", extra={'fields': {'signals': len(signals)}})
+
+        async def prepare(signal):
+            started = time_lib.perf_counter()
+            try:
+                legs, error = await self.prepare_signal(signal)
+            except Exception as e:
+                legs, error = None, str(e)
+            return legs, error, time_lib.perf_counter() - started
+
+        prepared = await asyncio.gather(*(prepare(signal) for signal in signals))
+        resolved_at = time_lib.perf_counter()
+
+        # Nothing is awaited while placing, so the orders go out in one burst
+        results = []
+        placed = []  # (result, trades)
+        closing = set()  # conIds an earlier exit in this batch already flattens
+        for signal, (legs, error, resolve_time) in zip(signals, prepared):
+            result = {"signal": signal, "resolveMs": round(resolve_time * 1000, 3)}
+            results.append(result)
+            if not error and 'Exit' in signal['action']:
+                legs = [(contract, order) for contract, order in legs if contract.conId not in closing]
+                closing.update(contract.conId for contract, _ in legs)
+                if not legs:
+                    error = "Position already closed by an earlier signal in this batch"
+            if error:
+                result.update(status="error", message=error)
+                continue
+            try:
+                trades = [self.place_order(contract, order) for contract, order in legs]
+            except Exception as e:
+                signal_log.error(f"Error placing batch order: {e}")
+                result.update(status="error", message=str(e))
+                continue
+            SIGNAL_LATENCY.observe(time_lib.perf_counter() - received_at)
+            result.update(status="success", order_ids=[trade.order.orderId for trade in trades])
+            placed.append((result, trades))
+        submitted_at = time_lib.perf_counter()
+
+        if wait_ack:
+            async def acknowledge(trade):
+                acknowledged = await self.wait_for_status(trade, self.ACK_STATES)
+                return acknowledged, time_lib.perf_counter() - received_at
+
+            acks = await asyncio.gather(*(acknowledge(trade) for _, trades in placed for trade in trades))
+            acks = iter(acks)
+            for result, trades in placed:
+                outcomes = [next(acks) for _ in trades]
+                result["acknowledged"] = all(acknowledged for acknowledged, _ in outcomes)
+                result["ackMs"] = round(max(elapsed for _, elapsed in outcomes) * 1000, 3)
+                result["orderStatus"] = [trade.orderStatus.status for trade in trades]
+                for trade in trades:
+                    self.order_status_monitor(trade)
+        finished_at = time_lib.perf_counter()
+
+        for result in results:
+            self.journal_signal(result["signal"], {key: value for key, value in result.items() if key != "signal"})
+        succeeded = sum(1 for result in results if result["status"] == "success")
+        timing = {
+            "resolveMs": round((resolved_at - received_at) * 1000, 3),
+            "submitMs": round((submitted_at - resolved_at) * 1000, 3),
+            "ackMs": round((finished_at - submitted_at) * 1000, 3) if wait_ack else None,
+            "totalMs": round((finished_at - received_at) * 1000, 3),
+        }
+        signal_log.info("Signal batch complete", extra={'fields': {
+            'signals': len(signals), 'succeeded': succeeded, **timing
+        }})
+        return {
+            "status": "success" if succeeded == len(results) else ("partial" if succeeded else "error"),
+            "count": len(results),
+            "succeeded": succeeded,
+            "timing": timing,
+            "results": results,
+        }
+
+    @staticmethod
+    async def sleep_until(when):
+        """Sleep until the wall-clock time when, re-checking so long sleeps do not drift"""
+        while True:
+            remaining = (when - datetime.now(when.tzinfo)).total_seconds()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, 60))
 
     async def auto_square_off_task(self):
+        """Flatten every position at the exact square-off cutoff of each session"""
+        # Started inside the cutoff window (e.g. after a restart), flatten right away
+        try:
+            if market_calendar.in_square_off_window():
+                await self.square_off_all()
+        except Exception as e:
+            order_log.error(f"Error in auto square off: {e}")
+
         while True:
             try:
-                est = pytz.timezone('US/Eastern')
-                current_time = datetime.now(est).time()
-                cutoff_time = time(15, 55)
-                
-                if current_time >= cutoff_time:
-                    positions = await self.get_positions()
-                    for pos in positions:
-                        await self.close_position(pos['contract']['conId'])
-                    await asyncio.sleep(3600 * 8)  # Sleep for 8 hours
-                await asyncio.sleep(60)  # Check every minute
+                cutoff = market_calendar.next_square_off()
+                order_log.info(f"Next auto square-off scheduled at {cutoff.isoformat()}")
+                await self.sleep_until(cutoff)
+                await self.square_off_all()
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                print(f"Error in auto square off: {e}")
+                order_log.error(f"Error in auto square off: {e}")
                 await asyncio.sleep(60)
 
+    async def retry_square_off(self):
+        try:
+            order_log.info("Retrying auto square-off after reconnect")
+            await self.square_off_all()
+        except Exception as e:
+            order_log.error(f"Error in auto square off: {e}")
+
+    @staticmethod
+    def close_order(position):
+        """(contract, order) that flattens position"""
+        action = 'SELL' if position.position > 0 else 'BUY'
+        return position.contract, MarketOrder(action, abs(position.position))
+
+    def submit_close(self, position):
+        """Place a market order that flattens position"""
+        return self.place_order(*self.close_order(position))
+
+    def place_order(self, contract, order):
+        """Submit an order and start its ack/fill latency clock"""
+        trade = self.order_ib.placeOrder(contract, order)
+        ORDERS_PLACED.inc()
+        self.orders.placed(trade)
+        return trade
+
+    async def square_off_all(self):
+        """Submit every closing order at once and wait for all of them together"""
+        started = time_lib.perf_counter()
+        # A close still working from an earlier attempt is left to finish rather than doubled
+        working = {lifecycle.con_id for lifecycle in map(self.orders.get, self.square_off_orders)
+                   if lifecycle is not None and not lifecycle.done}
+        legs = [self.position_index.get(con_id) for con_id in list(self.position_index.keys)
+                if con_id not in working]
+        trades = []
+        results = []
+        for position in legs:
+            try:
+                trades.append((position, self.submit_close(position)))
+            except Exception as e:
+                results.append({
+                    "conId": position.contract.conId,
+                    "localSymbol": position.contract.localSymbol,
+                    "status": "error",
+                    "message": str(e)
+                })
+
+        done_states = {'Filled', 'Cancelled', 'ApiCancelled', 'Inactive'}
+        completed = await asyncio.gather(*(
+            self.wait_for_status(trade, done_states, timeout=self.square_off_timeout)
+            for _, trade in trades
+        ))
+
+        for (position, trade), done in zip(trades, completed):
+            results.append({
+                "conId": position.contract.conId,
+                "localSymbol": position.contract.localSymbol,
+                "orderId": trade.order.orderId,
+                "status": "success" if trade.orderStatus.status == 'Filled' else "error",
+                "orderStatus": trade.orderStatus.status,
+                "filled": trade.orderStatus.filled,
+                "completed": done
+            })
+            self.order_status_monitor(trade)
+
+        self.square_off_orders = [trade.order.orderId for _, trade in trades]
+        self.last_square_off = {
+            "timestamp": time_lib.time(),
+            "legs": len(legs),
+            "flat": not working and all(result["status"] == "success" for result in results),
+            "timeToFlatMs": round((time_lib.perf_counter() - started) * 1000, 3),
+            "results": results
+        }
+        self.square_off_pending = not self.last_square_off['flat']
+        order_log.info("Auto square-off complete", extra={'fields': {
+            'legs': len(legs),
+            'flat': self.last_square_off['flat'],
+            'timeToFlatMs': self.last_square_off['timeToFlatMs']
+        }})
+        return self.last_square_off
+
+    async def wait_for_status(self, trade, states, timeout=None):
+        """Wait for trade to reach one of states; returns False if the timeout expires first"""
+        timeout = self.ack_timeout if timeout is None else timeout
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        while trade.orderStatus.status not in states:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._next_status(trade), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    @staticmethod
+    async def _next_status(trade):
+        return await trade.statusEvent
+
+    def order_result(self, trade, acknowledged, message, failed_states=()):
+        """Build an API result from the order state the broker reported"""
+        status = trade.orderStatus.status
+        if status in failed_states:
+            errors = [entry.message for entry in trade.log if entry.errorCode]
+            message = errors[-1] if errors else f"Order {status}"
+        return {
+            "status": "error" if status in failed_states else "success",
+            "message": message,
+            "order_id": trade.order.orderId,
+            "order_status": status,
+            "filled": trade.orderStatus.filled,
+            "remaining": trade.orderStatus.remaining,
+            "acknowledged": acknowledged
+        }
+
     async def close_position(self, position_id: int):
         try:
-            positions = self.ib.positions()
-            for pos in positions:
-                if pos.contract.conId == position_id:
-                    action = 'SELL' if pos.position > 0 else 'BUY'
-                    order = MarketOrder(action, abs(pos.position))
-                    trade = self.ib.placeOrder(pos.contract, order)
-                    await asyncio.sleep(0.5)  # Give some time for the order to process
-                    await self.resync_data()  # Resync all data
-                    return {"status": "success", "message": "Position close order placed"}
-            return {"status": "error", "message": "Position not found"}
+            pos = self.position_index.get(position_id)
+            if pos is None:
+                return {"status": "error", "message": "Position not found"}
+
+            trade = self.submit_close(pos)
+            # Return as soon as the broker acknowledges the order
+            acknowledged = await self.wait_for_status(trade, self.ACK_STATES)
+            self.order_status_monitor(trade)
+            return self.order_result(trade, acknowledged, "Position close order placed",
+                                     failed_states=('Cancelled', 'ApiCancelled', 'Inactive'))
         except Exception as e:
-            print(f"Error closing position: {e}")
+            order_log.error(f"Error closing position: {e}")
             return {"status": "error", "message": str(e)}
 
     async def cancel_order(self, order_id):
         try:
-            trades = self.ib.trades()
-            for trade in trades:
-                if trade.order.orderId == int(order_id):
-                    self.ib.cancelOrder(trade.order)
-                    await asyncio.sleep(0.5)  # Give some time for the cancel to process
-                    await self.resync_data()  # Resync all data
-                    return {"status": "success", "message": "Order cancelled"}
-            return {"status": "error", "message": "Order not found"}
+            lifecycle = self.orders.get(int(order_id))
+            if lifecycle is None:
+                return {"status": "error", "message": "Order not found"}
+            trade = lifecycle.trade
+            if trade.isDone():
+                return {"status": "error", "message": f"Order already {trade.orderStatus.status}",
+                        "order_id": trade.order.orderId, "order_status": trade.orderStatus.status}
+            self.order_ib.cancelOrder(trade.order)
+            # Return as soon as the broker confirms the cancel (or a fill won the race)
+            acknowledged = await self.wait_for_status(trade, self.CANCEL_STATES)
+            self.order_status_monitor(trade)
+            if trade.orderStatus.status == 'Filled':
+                # The fill reached the exchange before the cancel did
+                return {**self.order_result(trade, acknowledged, "Order already Filled"), "status": "error"}
+            return self.order_result(trade, acknowledged, "Order cancelled",
+                                     failed_states=('Inactive',))
         except Exception as e:
-            print(f"Error canceling order: {e}")
+            order_log.error(f"Error canceling order: {e}")
             return {"status": "error", "message": str(e)}
 
-    # Add error handling for market data subscription errors
-    # async def ensure_market_data(self, contract):
-    #     """Ensure we're in the event loop when requesting market data"""
-    #     try:
-    #         # If it's SPY, use the existing subscription
-    #         if contract.symbol == 'SPY':
-    #             return self.market_data_tickers.get('SPY')
-                
-    #         loop = asyncio.get_event_loop()
-    #         if loop.is_running():
-    #             self.ib.reqMarketDataType(4)
-    #             await asyncio.sleep(0.1)
-                
-    #             ticker = self.ib.reqMktData(contract)
-    #             await asyncio.sleep(1)
-    #             return ticker
-    #         else:
-    #             print("Event loop is not running")
-    #             return None
-    #     except Exception as e:
-    #         print(f"Error requesting market data: {e}")
-    #         return None
-
     async def resync_data(self):
-        """Resync all data from IB"""
+        """Reconcile local state with IB immediately, applying only what changed"""
         try:
-            print("Resyncing data from IB...")
-            
-            # Resync positions
-            positions = self.ib.positions()
-            self.positions.clear()  # Clear existing positions
-            for position in positions:
-                self.position_monitor(position)
-                
-            # Resync orders
-            trades = self.ib.trades()
-            self.open_orders.clear()  # Clear existing orders
-            for trade in trades:
-                self.order_status_monitor(trade)
-                
-            # Resync portfolio data
-            portfolio = self.ib.portfolio()
-            for item in portfolio:
-                self.portfolio_monitor(item)
-                
-            print("Data resync complete")
-            
+            return self.reconciler.reconcile()
         except Exception as e:
-            print(f"Error during data resync: {e}")
+            log.error(f"Error during data resync: {e}")
 
     def __del__(self):
         """Cleanup resources on object destruction"""
@@ -552,4 +1030,4 @@ class IBHandler:
                 else:
                     loop.run_until_complete(self.disconnect())
         except Exception as e:
-            print(f"Error during cleanup: {e}")
\ No newline at end of file
+            log.error(f"Error during cleanup: {e}")
\ No newline at end of file
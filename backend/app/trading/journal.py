@@ -0,0 +1,180 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time as time_lib
+from ..logging_config import get_logger
+
+log = get_logger('journal')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    symbol TEXT,
+    local_symbol TEXT,
+    ref TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_symbol_ts ON events (symbol, ts);
+CREATE INDEX IF NOT EXISTS events_local_symbol_ts ON events (local_symbol, ts);
+CREATE INDEX IF NOT EXISTS events_kind_ts ON events (kind, ts);
+"""
+
+KINDS = ('signal', 'order', 'fill', 'position', 'pnl')
+
+_STOP = object()
+
+
+class Journal:
+    """Append-only SQLite journal of signals, order transitions, fills, positions and PnL"""
+
+    def __init__(self, path, batch_size=500, flush_interval=0.25, max_pending=100000):
+        self.path = path
+        self.batch_size = batch_size  # Most rows written per transaction
+        self.flush_interval = flush_interval  # Seconds a lone row may wait for company
+        self.max_pending = max_pending
+        self.queue = queue.Queue()
+        self.thread = None
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.last_batch = 0.0  # Seconds the last transaction took
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=5)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def start(self):
+        if self.thread is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self.connect()
+        connection.executescript(SCHEMA)
+        connection.close()
+        self.thread = threading.Thread(target=self._run, name='journal', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Write everything still queued, then stop the writer"""
+        if self.thread is None:
+            return
+        self.queue.put(_STOP)
+        self.thread.join(timeout=10)
+        self.thread = None
+
+    def record(self, kind, data, symbol=None, local_symbol=None, ref=None, ts=None):
+        """Queue one entry; never blocks, drops the entry if the writer has fallen far behind"""
+        if self.queue.qsize() >= self.max_pending:
+            self.dropped += 1
+            return
+        row = (ts or time_lib.time(), kind, symbol, local_symbol,
+               str(ref) if ref is not None else None, json.dumps(data, default=str))
+        self.queue.put(row)
+
+    def _run(self):
+        connection = self.connect()
+        try:
+            while True:
+                row = self.queue.get()
+                stopping = row is _STOP
+                rows = [] if stopping else [row]
+                # Give a lone row a moment to gather others into the same transaction
+                deadline = time_lib.monotonic() + self.flush_interval
+                while not stopping and len(rows) < self.batch_size:
+                    try:
+                        row = self.queue.get(timeout=max(0.0, deadline - time_lib.monotonic()))
+                    except queue.Empty:
+                        break
+                    if row is _STOP:
+                        stopping = True
+                    else:
+                        rows.append(row)
+                while stopping and not self.queue.empty():
+                    row = self.queue.get_nowait()
+                    if row is not _STOP:
+                        rows.append(row)
+                if rows:
+                    self._write(connection, rows)
+                if stopping:
+                    return
+        finally:
+            connection.close()
+
+    def _write(self, connection, rows):
+        started = time_lib.perf_counter()
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO events (ts, kind, symbol, local_symbol, ref, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+        except sqlite3.Error as e:
+            self.dropped += len(rows)
+            log.error(f"Could not write {len(rows)} journal entries: {e}")
+            return
+        self.written += len(rows)
+        self.batches += 1
+        self.last_batch = time_lib.perf_counter() - started
+
+    def query(self, start=None, end=None, symbol=None, kind=None, limit=1000):
+        """Entries with start <= ts < end, oldest first, optionally for one symbol or local symbol and kind"""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(end)
+        if symbol:
+            clauses.append("(symbol = ? OR local_symbol = ?)")
+            params += [symbol, symbol]
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        sql = "SELECT id, ts, kind, symbol, local_symbol, ref, data FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts, id LIMIT ?"
+        params.append(limit)
+
+        connection = self.connect()
+        try:
+            rows = connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+        return [
+            {
+                "id": row[0],
+                "ts": row[1],
+                "kind": row[2],
+                "symbol": row[3],
+                "localSymbol": row[4],
+                "ref": row[5],
+                "data": json.loads(row[6]),
+            }
+            for row in rows
+        ]
+
+    def status(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = None
+        return {
+            "path": self.path,
+            "running": self.thread is not None and self.thread.is_alive(),
+            "pending": self.queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "lastBatchMs": round(self.last_batch * 1000, 3),
+            "sizeBytes": size,
+        }
@@ -0,0 +1,126 @@
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+EASTERN = ZoneInfo('America/New_York')
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+SQUARE_OFF_LEAD = timedelta(minutes=5)  # Flatten 5 minutes before the close (15:55 on a full day)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th weekday (0 = Monday) of a month, n = -1 for the last one"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(day):
+    """Saturday holidays are observed on Friday, Sunday holidays on Monday"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def holidays(year):
+    """NYSE full-day holidays for year"""
+    days = {
+        _nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),  # Memorial Day
+        _observed(date(year, 7, 4)),  # Independence Day
+        _nth_weekday(year, 9, 0, 1),  # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _observed(date(year, 12, 25)),  # Christmas
+    }
+    # New Year's Day falling on a Saturday is not observed on the prior Friday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days.add(_observed(new_year))
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return frozenset(days)
+
+
+@lru_cache(maxsize=None)
+def early_closes(year):
+    """Days the NYSE closes at 13:00"""
+    candidates = [
+        date(year, 7, 3),  # Day before Independence Day
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),  # Day after Thanksgiving
+        date(year, 12, 24),  # Christmas Eve
+    ]
+    return frozenset(day for day in candidates if is_trading_day(day))
+
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+def session_close(day):
+    close = EARLY_CLOSE if day in early_closes(day.year) else MARKET_CLOSE
+    return datetime.combine(day, close, tzinfo=EASTERN)
+
+
+def square_off_time(day):
+    return session_close(day) - SQUARE_OFF_LEAD
+
+
+def next_trading_day(day):
+    day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return day
+
+
+def next_open(now=None):
+    """Next session open strictly after now"""
+    now = (now or datetime.now(EASTERN)).astimezone(EASTERN)
+    day = now.date()
+    if not (is_trading_day(day) and now < datetime.combine(day, MARKET_OPEN, tzinfo=EASTERN)):
+        day = next_trading_day(day)
+    return datetime.combine(day, MARKET_OPEN, tzinfo=EASTERN)
+
+
+def next_square_off(now=None):
+    """Next square-off cutoff strictly after now"""
+    now = (now or datetime.now(EASTERN)).astimezone(EASTERN)
+    day = now.date()
+    if not (is_trading_day(day) and now < square_off_time(day)):
+        day = next_trading_day(day)
+    return square_off_time(day)
+
+
+def in_square_off_window(now=None):
+    """True between today's cutoff and the close, when no new positions should open"""
+    now = (now or datetime.now(EASTERN)).astimezone(EASTERN)
+    day = now.date()
+    return is_trading_day(day) and square_off_time(day) <= now < session_close(day)
+
+
+def past_cutoff(now=None):
+    """True once today's square-off cutoff has passed"""
+    now = (now or datetime.now(EASTERN)).astimezone(EASTERN)
+    return now >= square_off_time(now.date())
@@ -0,0 +1,115 @@
+import time as time_lib
+from collections import OrderedDict
+from ..logging_config import get_logger
+
+log = get_logger('marketdata')
+
+
+class Subscription:
+    __slots__ = ('contract', 'ticker', 'holders', 'last_used')
+
+    def __init__(self, contract, ticker):
+        self.contract = contract
+        self.ticker = ticker
+        self.holders = set()  # Who needs this line, e.g. 'spy', 'mes', 'position', 'candidate'
+        self.last_used = time_lib.monotonic()
+
+
+class MarketDataManager:
+    """Reference-counted market data lines, kept within IB's line limit
+
+    Lines nobody holds stay open so a re-subscribe is free, and are cancelled
+    least recently used first once a new line would exceed max_lines.
+    """
+
+    def __init__(self, ib, max_lines=100, on_cancel=None):
+        self.ib = ib
+        self.max_lines = max_lines
+        self.on_cancel = on_cancel  # Called with the contract whenever its line is closed
+        self.lines = OrderedDict()  # conId -> Subscription, least recently used first
+        self.evictions = 0
+        self.rejections = 0
+
+    def subscribe(self, contract, holder):
+        """Return the ticker for contract, requesting a line only if none is open"""
+        sub = self.lines.get(contract.conId)
+        if sub is None:
+            if len(self.lines) >= self.max_lines and not self._evict_idle():
+                self.rejections += 1
+                log.warning("Market data line limit reached", extra={'fields': {
+                    'localSymbol': contract.localSymbol, 'lines': len(self.lines), 'holder': holder
+                }})
+                return None
+            sub = Subscription(contract, self.ib.reqMktData(contract))
+            self.lines[contract.conId] = sub
+            log.info("Subscribed market data", extra={'fields': {
+                'localSymbol': contract.localSymbol, 'holder': holder, 'lines': len(self.lines)
+            }})
+        else:
+            self.lines.move_to_end(contract.conId)
+        sub.holders.add(holder)
+        sub.last_used = time_lib.monotonic()
+        return sub.ticker
+
+    def release(self, con_id, holder, cancel=False):
+        """Drop holder's claim on a line; with cancel, close it if nobody else holds it"""
+        sub = self.lines.get(con_id)
+        if sub is None:
+            return
+        sub.holders.discard(holder)
+        if not sub.holders:
+            sub.last_used = time_lib.monotonic()
+            if cancel:
+                self._cancel(con_id)
+
+    def ticker(self, con_id):
+        sub = self.lines.get(con_id)
+        return sub.ticker if sub else None
+
+    def _evict_idle(self):
+        """Cancel the least recently used line nobody holds; False if every line is held"""
+        for con_id, sub in self.lines.items():
+            if not sub.holders:
+                self._cancel(con_id)
+                self.evictions += 1
+                return True
+        return False
+
+    def _cancel(self, con_id):
+        sub = self.lines.pop(con_id)
+        try:
+            self.ib.cancelMktData(sub.contract)
+        except Exception as e:
+            log.error(f"Error cancelling market data for {sub.contract.localSymbol}: {e}")
+        log.info("Cancelled market data", extra={'fields': {
+            'localSymbol': sub.contract.localSymbol, 'lines': len(self.lines)
+        }})
+        if self.on_cancel is not None:
+            self.on_cancel(sub.contract)
+
+    def resubscribe(self):
+        """Request every open line again, e.g. after the data client reconnected"""
+        for sub in self.lines.values():
+            sub.ticker = self.ib.reqMktData(sub.contract)
+
+    def cancel_all(self):
+        for con_id in list(self.lines):
+            self._cancel(con_id)
+
+    def status(self):
+        now = time_lib.monotonic()
+        return {
+            "lines": len(self.lines),
+            "maxLines": self.max_lines,
+            "evictions": self.evictions,
+            "rejections": self.rejections,
+            "subscriptions": [
+                {
+                    "conId": con_id,
+                    "localSymbol": sub.contract.localSymbol,
+                    "holders": sorted(sub.holders),
+                    "idleSeconds": round(now - sub.last_used, 1) if not sub.holders else 0.0
+                }
+                for con_id, sub in self.lines.items()
+            ]
+        }
@@ -0,0 +1,95 @@
+import bisect
+from ib_insync import Option
+
+
+class OptionChain:
+    """Option chain fetched once per session with an incrementally maintained ATM index"""
+
+    def __init__(self, ib, symbol='SPY', exchange='SMART'):
+        self.ib = ib
+        self.symbol = symbol
+        self.exchange = exchange
+        self.expirations = []
+        self.strikes = {}  # expiry -> sorted strikes actually listed for that expiry, loaded on demand
+        self.expiry = None  # Expiry whose ATM index is tracked on every tick
+        self.atm_index = None
+        self.last_price = None
+
+    async def load(self, underlying):
+        """Fetch the expirations with a single reqSecDefOptParams call
+
+        Its strike set is the union over every expiration, so the strikes of an
+        expiry are loaded separately by load_expiry.
+        """
+        chains = await self.ib.reqSecDefOptParamsAsync(
+            underlying.symbol, '', underlying.secType, underlying.conId
+        )
+        chain = next((c for c in chains if c.exchange == self.exchange), None)
+        if chain is None and chains:
+            chain = chains[0]
+        if chain is None:
+            return 0
+
+        self.expirations = sorted(chain.expirations)
+        self.strikes = {}
+        self.atm_index = None
+        return len(self.expirations)
+
+    async def load_expiry(self, expiry):
+        """Load the strikes listed for expiry with one contract details request
+
+        Returns the qualified contracts so the caller can cache them.
+        """
+        details = await self.ib.reqContractDetailsAsync(Option(self.symbol, expiry, exchange=self.exchange))
+        contracts = [detail.contract for detail in details]
+        self.strikes[expiry] = sorted(set(float(contract.strike) for contract in contracts))
+        if expiry == self.expiry:
+            self.atm_index = None
+            self.set_expiry(expiry)
+        return contracts
+
+    def set_expiry(self, expiry):
+        """Track the ATM index for expiry, re-seeding it from the last price"""
+        if expiry != self.expiry:
+            self.expiry = expiry
+            self.atm_index = None
+        if self.last_price is not None:
+            self.update_price(self.last_price)
+
+    def update_price(self, price):
+        """Move the ATM index to the strike nearest price; returns True if it changed"""
+        self.last_price = price
+        strikes = self.strikes.get(self.expiry)
+        if not strikes:
+            return False
+
+        index = self.atm_index
+        if index is None:
+            # Seed with a binary search, ticks then walk from here
+            index = min(bisect.bisect_left(strikes, price), len(strikes) - 1)
+            if index > 0 and price - strikes[index - 1] <= strikes[index] - price:
+                index -= 1
+        else:
+            # Price moves a strike or two between ticks, so walking is O(1) amortised
+            while index + 1 < len(strikes) and abs(strikes[index + 1] - price) < abs(strikes[index] - price):
+                index += 1
+            while index > 0 and abs(strikes[index - 1] - price) <= abs(strikes[index] - price):
+                index -= 1
+
+        changed = index != self.atm_index
+        self.atm_index = index
+        return changed
+
+    def atm_strike(self):
+        if self.atm_index is None:
+            return None
+        return self.strikes[self.expiry][self.atm_index]
+
+    def otm_strike(self, right, otm_strikes):
+        """Return the strike otm_strikes steps out of the money from ATM for right ('C'/'P')"""
+        if self.atm_index is None:
+            return None
+        strikes = self.strikes[self.expiry]
+        if right == 'C':
+            return strikes[min(self.atm_index + otm_strikes, len(strikes) - 1)]
+        return strikes[max(self.atm_index - otm_strikes, 0)]
@@ -0,0 +1,207 @@
+import time as time_lib
+from ..metrics import ORDER_ACK_LATENCY, ORDER_FILL_LATENCY
+
+ACK_STATES = frozenset(('PreSubmitted', 'Submitted', 'Filled', 'Cancelled', 'ApiCancelled', 'Inactive'))
+TERMINAL_STATES = frozenset(('Filled', 'Cancelled', 'ApiCancelled', 'Inactive'))
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+class OrderLifecycle:
+    """One order and the time it reached each state"""
+
+    __slots__ = ('trade', 'order_id', 'perm_id', 'con_id', 'local_symbol', 'action', 'quantity', 'placed',
+                 'status', 'filled', 'events', 'created_at', 'acked_at', 'filled_at', 'done_at')
+
+    def __init__(self, trade, placed):
+        order = trade.order
+        self.trade = trade
+        self.order_id = order.orderId
+        self.perm_id = order.permId or None
+        self.con_id = trade.contract.conId
+        self.local_symbol = trade.contract.localSymbol
+        self.action = order.action
+        self.quantity = order.totalQuantity
+        self.placed = placed  # Placed by this backend, so submit-to-ack is meaningful
+        self.status = None
+        self.filled = 0.0
+        self.events = []  # (state, wall-clock time, perf_counter, filled)
+        self.created_at = None
+        self.acked_at = None
+        self.filled_at = None
+        self.done_at = None
+        self.record('Created', 0.0)
+
+    def record(self, state, filled):
+        now = time_lib.perf_counter()
+        self.events.append((state, time_lib.time(), now, filled))
+        if state == 'Created':
+            self.created_at = now
+            return
+        if state in ACK_STATES and self.acked_at is None:
+            self.acked_at = now
+            if self.placed:
+                ORDER_ACK_LATENCY.observe(self.submit_to_ack)
+        if state == 'Filled':
+            self.filled_at = now
+            if self.placed:
+                ORDER_FILL_LATENCY.observe(now - self.created_at)
+        if state in TERMINAL_STATES:
+            self.done_at = now
+
+    @property
+    def done(self):
+        return self.done_at is not None
+
+    @property
+    def submit_to_ack(self):
+        if not self.placed or self.acked_at is None:
+            return None
+        return self.acked_at - self.created_at
+
+    @property
+    def ack_to_fill(self):
+        if self.acked_at is None or self.filled_at is None:
+            return None
+        return self.filled_at - self.acked_at
+
+    def to_dict(self):
+        return {
+            "orderId": self.order_id,
+            "permId": self.perm_id,
+            "conId": self.con_id,
+            "localSymbol": self.local_symbol,
+            "action": self.action,
+            "totalQuantity": self.quantity,
+            "status": self.status,
+            "filled": self.filled,
+            "placedHere": self.placed,
+            "submitToAckMs": _ms(self.submit_to_ack),
+            "ackToFillMs": _ms(self.ack_to_fill),
+            "transitions": [
+                {"state": state, "time": wall, "elapsedMs": _ms(at - self.created_at), "filled": filled}
+                for state, wall, at, filled in self.events
+            ]
+        }
+
+
+class OrderStore:
+    """Every order seen this session, indexed by orderId, permId and contract
+
+    Status events append a timestamped transition (created, PreSubmitted, Submitted,
+    each partial fill, then Filled or Cancelled) instead of rebuilding anything, and
+    every lookup is a dict access rather than a scan of ib.trades().
+    """
+
+    def __init__(self, on_transition=None):
+        self.on_transition = on_transition  # Called with (lifecycle, state) for every recorded transition
+        self.orders = {}  # orderId -> OrderLifecycle
+        self.by_perm = {}  # permId -> OrderLifecycle, once IB has assigned one
+        self.by_contract = {}  # conId -> {orderId: OrderLifecycle}, oldest first
+
+    def placed(self, trade):
+        """Start the clock for an order we just sent"""
+        lifecycle = self.orders.get(trade.order.orderId)
+        if lifecycle is not None:
+            # A status event arrived before placeOrder returned
+            lifecycle.placed = True
+            return lifecycle
+        lifecycle = OrderLifecycle(trade, placed=True)
+        self._add(lifecycle)
+        self._notify(lifecycle, 'Created')
+        return lifecycle
+
+    def update(self, trade):
+        """Apply a status event, recording a transition if the state or fill moved"""
+        lifecycle = self.orders.get(trade.order.orderId)
+        if lifecycle is None:
+            # Orders from other clients or a previous session are timed from when we first see them
+            lifecycle = OrderLifecycle(trade, placed=False)
+            self._add(lifecycle)
+            self._notify(lifecycle, 'Created')
+        lifecycle.trade = trade  # ib_insync may hand out a new Trade after a reconnect
+
+        perm_id = trade.order.permId
+        if perm_id and lifecycle.perm_id != perm_id:
+            lifecycle.perm_id = perm_id
+            self.by_perm[perm_id] = lifecycle
+
+        status = trade.orderStatus.status
+        filled = trade.orderStatus.filled or 0.0
+        if status != lifecycle.status:
+            state = status
+        elif filled > lifecycle.filled:
+            state = 'PartialFill'
+        else:
+            return lifecycle
+        lifecycle.record(state, filled)
+        lifecycle.status = status
+        lifecycle.filled = filled
+        self._notify(lifecycle, state)
+        return lifecycle
+
+    def _notify(self, lifecycle, state):
+        if self.on_transition is not None:
+            self.on_transition(lifecycle, state)
+
+    def _add(self, lifecycle):
+        self.orders[lifecycle.order_id] = lifecycle
+        if lifecycle.perm_id:
+            self.by_perm[lifecycle.perm_id] = lifecycle
+        self.by_contract.setdefault(lifecycle.con_id, {})[lifecycle.order_id] = lifecycle
+
+    def remove(self, order_id):
+        lifecycle = self.orders.pop(order_id, None)
+        if lifecycle is None:
+            return None
+        if lifecycle.perm_id and self.by_perm.get(lifecycle.perm_id) is lifecycle:
+            del self.by_perm[lifecycle.perm_id]
+        bucket = self.by_contract.get(lifecycle.con_id)
+        if bucket is not None:
+            bucket.pop(order_id, None)
+            if not bucket:
+                del self.by_contract[lifecycle.con_id]
+        return lifecycle
+
+    def get(self, order_id):
+        return self.orders.get(order_id)
+
+    def get_by_perm_id(self, perm_id):
+        return self.by_perm.get(perm_id)
+
+    def for_contract(self, con_id):
+        return list(self.by_contract.get(con_id, {}).values())
+
+    def recent(self, limit=50, con_id=None):
+        """Newest orders first, optionally only those for con_id"""
+        source = self.by_contract.get(con_id, {}) if con_id is not None else self.orders
+        lifecycles = list(source.values())[-limit:] if limit else []
+        return [lifecycle.to_dict() for lifecycle in reversed(lifecycles)]
+
+    @staticmethod
+    def _summary(values):
+        if not values:
+            return {"count": 0, "avgMs": None, "p50Ms": None, "p95Ms": None, "maxMs": None}
+        values = sorted(values)
+        return {
+            "count": len(values),
+            "avgMs": _ms(sum(values) / len(values)),
+            "p50Ms": _ms(values[len(values) // 2]),
+            "p95Ms": _ms(values[min(len(values) - 1, int(len(values) * 0.95))]),
+            "maxMs": _ms(values[-1]),
+        }
+
+    def latency_summary(self):
+        lifecycles = self.orders.values()
+        return {
+            "orders": len(self.orders),
+            "open": sum(1 for lifecycle in lifecycles if not lifecycle.done),
+            "submitToAck": self._summary([
+                lifecycle.submit_to_ack for lifecycle in lifecycles if lifecycle.submit_to_ack is not None
+            ]),
+            "ackToFill": self._summary([
+                lifecycle.ack_to_fill for lifecycle in lifecycles if lifecycle.ack_to_fill is not None
+            ]),
+        }
@@ -0,0 +1,60 @@
+class PositionIndex:
+    """Open positions bucketed by (underlying, secType, right, side) for constant-time exit matching"""
+
+    POLICIES = ('all', 'oldest', 'largest')
+
+    def __init__(self):
+        self.buckets = {}  # key -> {conId: Position}, insertion ordered so oldest leg is first
+        self.keys = {}  # conId -> key of the bucket holding it
+
+    @staticmethod
+    def make_key(underlying, sec_type, right, side):
+        return (underlying, sec_type, right or '', side)
+
+    @staticmethod
+    def key_for(position):
+        contract = position.contract
+        side = 'LONG' if position.position > 0 else 'SHORT'
+        return PositionIndex.make_key(contract.symbol, contract.secType, contract.right, side)
+
+    def update(self, position):
+        """Apply a position event; zero quantity removes the leg"""
+        con_id = position.contract.conId
+        if position.position == 0:
+            self.remove(con_id)
+            return
+
+        key = self.key_for(position)
+        old_key = self.keys.get(con_id)
+        if old_key is not None and old_key != key:
+            # Side flipped, the leg now counts as newly opened in its new bucket
+            self.remove(con_id)
+        self.buckets.setdefault(key, {})[con_id] = position
+        self.keys[con_id] = key
+
+    def remove(self, con_id):
+        key = self.keys.pop(con_id, None)
+        if key is None:
+            return
+        bucket = self.buckets.get(key)
+        if bucket is not None:
+            bucket.pop(con_id, None)
+            if not bucket:
+                del self.buckets[key]
+
+    def get(self, con_id):
+        key = self.keys.get(con_id)
+        if key is None:
+            return None
+        return self.buckets[key].get(con_id)
+
+    def match(self, underlying, sec_type, right, side, policy='oldest'):
+        """Return the legs an exit should close under policy ('all', 'oldest' or 'largest')"""
+        bucket = self.buckets.get(self.make_key(underlying, sec_type, right, side))
+        if not bucket:
+            return []
+        if policy == 'all':
+            return list(bucket.values())
+        if policy == 'largest':
+            return [max(bucket.values(), key=lambda position: abs(position.position))]
+        return [next(iter(bucket.values()))]
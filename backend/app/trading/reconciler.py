@@ -0,0 +1,121 @@
+import asyncio
+import time as time_lib
+from ..logging_config import get_logger
+from ..metrics import RECONCILE_DRIFT
+from ..models.state import clean_float
+
+log = get_logger('reconcile')
+
+
+class Reconciler:
+    """Diffs broker state against the handler's local store and applies only the changes"""
+
+    def __init__(self, handler, interval=30.0):
+        self.handler = handler
+        self.interval = interval  # Seconds between scheduled reconciliations
+        self.runs = 0
+        self.last_run = None
+        self.last_duration = 0.0
+        self.last_drift = {}
+        self.drift_counts = {
+            'positions_added': 0,
+            'positions_removed': 0,
+            'positions_changed': 0,
+            'orders_added': 0,
+            'orders_removed': 0,
+            'orders_changed': 0,
+        }
+
+    def reconcile(self):
+        """Bring positions and open orders in line with IB; returns the drift found"""
+        started = time_lib.perf_counter()
+        drift = dict.fromkeys(self.drift_counts, 0)
+        self._reconcile_positions(drift)
+        self._reconcile_orders(drift)
+
+        for key, count in drift.items():
+            self.drift_counts[key] += count
+        RECONCILE_DRIFT.inc(sum(drift.values()))
+        self.runs += 1
+        self.last_run = time_lib.time()
+        self.last_duration = time_lib.perf_counter() - started
+        self.last_drift = drift
+
+        if any(drift.values()):
+            log.warning("Reconciliation corrected drift", extra={'fields': drift})
+        return drift
+
+    def _reconcile_positions(self, drift):
+        handler = self.handler
+        broker = {p.contract.conId: p for p in handler.ib.positions() if p.position != 0}
+
+        stale = [con_id for con_id in handler.positions if con_id not in broker]
+        stale += [con_id for con_id in handler.position_index.keys if con_id not in broker]
+        for con_id in set(stale):
+            if handler.positions.pop(con_id, None) is not None:
+                drift['positions_removed'] += 1
+            handler.position_index.remove(con_id)
+            handler.market_data.release(con_id, 'position', cancel=True)
+
+        for con_id, position in broker.items():
+            local = handler.positions.get(con_id)
+            if local is None:
+                handler.position_monitor(position)
+                drift['positions_added'] += 1
+            elif local.update_position(position.position, position.avgCost):
+                handler.position_index.update(position)
+                drift['positions_changed'] += 1
+
+        # Prices are not drift, but refresh them in place for positions we hold
+        for item in handler.ib.portfolio():
+            handler.portfolio_monitor(item)
+
+        if drift['positions_added'] or drift['positions_removed'] or drift['positions_changed']:
+            handler.mark_changed('positions')
+
+    def _reconcile_orders(self, drift):
+        handler = self.handler
+        # openTrades() only holds live orders, so cost stays flat as the session's history grows
+        broker = {trade.order.orderId: trade for trade in handler.order_ib.openTrades()}
+
+        for order_id in [order_id for order_id in handler.open_orders if order_id not in broker]:
+            lifecycle = handler.orders.get(order_id)
+            if lifecycle is not None and lifecycle.done:
+                # Cancelled or rejected orders stay listed on purpose; the retention sweep removes them
+                continue
+            handler.open_orders.pop(order_id, None)
+            drift['orders_removed'] += 1
+
+        for order_id, trade in broker.items():
+            local = handler.open_orders.get(order_id)
+            status = trade.orderStatus
+            if local is None:
+                handler.order_status_monitor(trade)
+                drift['orders_added'] += 1
+            elif local.status != status.status or local.filled != clean_float(status.filled):
+                handler.order_status_monitor(trade)
+                drift['orders_changed'] += 1
+
+        if drift['orders_removed']:
+            handler.mark_changed('orders')
+
+    def status(self):
+        return {
+            "runs": self.runs,
+            "lastRun": self.last_run,
+            "lastDurationMs": round(self.last_duration * 1000, 3),
+            "lastDrift": self.last_drift,
+            "driftTotals": self.drift_counts,
+        }
+
+    async def run(self):
+        """Reconcile on a fixed schedule rather than after every user action"""
+        while True:
+            try:
+                await asyncio.sleep(self.interval)
+                if self.handler.pool.is_connected():
+                    self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Error during reconciliation: {e}")
\ No newline at end of file
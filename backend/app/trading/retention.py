@@ -0,0 +1,235 @@
+import asyncio
+import json
+import os
+import time as time_lib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from ..logging_config import get_logger
+
+log = get_logger('retention')
+
+
+def fill_record(fill):
+    execution = fill.execution
+    return {
+        "execId": execution.execId,
+        "time": fill.time.timestamp() if fill.time else None,
+        "orderId": execution.orderId,
+        "permId": execution.permId,
+        "conId": fill.contract.conId,
+        "localSymbol": fill.contract.localSymbol,
+        "side": execution.side,
+        "shares": execution.shares,
+        "price": execution.price,
+        "commission": fill.commissionReport.commission if fill.commissionReport else None,
+    }
+
+
+def process_memory():
+    """Resident and peak resident set size in bytes, None where the platform does not say"""
+    rss = peak = None
+    try:
+        with open('/proc/self/statm') as f:
+            rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+    except ImportError:
+        pass
+    return {"rssBytes": rss, "maxRssBytes": peak}
+
+
+class Archive:
+    """Aged-out records appended as JSON lines to one file per kind and day"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='archive')
+        self.written = 0
+
+    def path(self, kind):
+        return os.path.join(self.directory, f"{kind}-{datetime.now(timezone.utc):%Y-%m-%d}.jsonl")
+
+    def _write(self, kind, records):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path(kind), 'a') as f:
+                for record in records:
+                    f.write(json.dumps(record, default=str))
+                    f.write('\n')
+            self.written += len(records)
+        except OSError as e:
+            log.error(f"Could not archive {len(records)} {kind}: {e}")
+
+    def write(self, kind, records):
+        if records:
+            asyncio.get_event_loop().run_in_executor(self.executor, self._write, kind, records)
+
+
+class Retention:
+    """Ages out and caps order, trade and fill history, archiving whatever is dropped"""
+
+    def __init__(self, handler, order_ttl=3600.0, closed_order_ttl=300.0, max_orders=1000,
+                 fill_ttl=86400.0, max_fills=5000, archive_dir=None, interval=60.0):
+        self.handler = handler
+        self.order_ttl = order_ttl  # Seconds a finished order stays in the order store
+        self.closed_order_ttl = closed_order_ttl  # Seconds a cancelled or rejected order stays listed as open
+        self.max_orders = max_orders
+        self.fill_ttl = fill_ttl
+        self.max_fills = max_fills
+        self.interval = interval
+        self.archive = Archive(archive_dir) if archive_dir else None
+        self.sweeps = 0
+        self.last_sweep = None
+        self.last_duration = 0.0
+        self.totals = {'orders_archived': 0, 'closed_orders_removed': 0, 'trades_dropped': 0, 'fills_archived': 0}
+
+    def sweep(self):
+        """Age out and cap every history; returns what was removed"""
+        started = time_lib.perf_counter()
+        removed = dict.fromkeys(self.totals, 0)
+        self._sweep_open_orders(started, removed)
+        archived = self._sweep_orders(started, removed)
+        # Each IB client keeps its own trade and fill history
+        for connection in self.handler.pool.connections:
+            wrapper = getattr(connection.client, 'wrapper', None)
+            if wrapper is not None:
+                self._sweep_trades(wrapper, removed)
+                archived_fills = self._sweep_fills(wrapper, removed)
+                if self.archive:
+                    self.archive.write('fills', archived_fills)
+        if self.archive:
+            self.archive.write('orders', archived)
+
+        for key, count in removed.items():
+            self.totals[key] += count
+        self.sweeps += 1
+        self.last_sweep = time_lib.time()
+        self.last_duration = time_lib.perf_counter() - started
+        if any(removed.values()):
+            log.info("Retention sweep", extra={'fields': {
+                **removed, 'durationMs': round(self.last_duration * 1000, 3)
+            }})
+        return removed
+
+    def _sweep_open_orders(self, now, removed):
+        # Cancelled or rejected orders keep remaining > 0, so order_status_monitor leaves them listed
+        handler = self.handler
+        stale = []
+        for order_id in handler.open_orders:
+            lifecycle = handler.orders.get(order_id)
+            if lifecycle is not None and lifecycle.done and now - lifecycle.done_at > self.closed_order_ttl:
+                stale.append(order_id)
+        for order_id in stale:
+            del handler.open_orders[order_id]
+        if stale:
+            removed['closed_orders_removed'] += len(stale)
+            handler.mark_changed('orders')
+
+    def _sweep_orders(self, now, removed):
+        store = self.handler.orders
+        finished = [lifecycle for lifecycle in store.orders.values() if lifecycle.done]
+        # Everything past its TTL, then the oldest finished orders until the cap is met; open orders always stay
+        expired = {lifecycle.order_id: lifecycle for lifecycle in finished
+                   if now - lifecycle.done_at > self.order_ttl}
+        excess = len(store.orders) - self.max_orders
+        for lifecycle in finished:
+            if len(expired) >= excess:
+                break
+            expired.setdefault(lifecycle.order_id, lifecycle)
+
+        listed = False
+        for order_id in expired:
+            store.remove(order_id)
+            listed |= self.handler.open_orders.pop(order_id, None) is not None
+        if listed:
+            self.handler.mark_changed('orders')
+        removed['orders_archived'] += len(expired)
+        return [lifecycle.to_dict() for lifecycle in expired.values()]
+
+    def _sweep_trades(self, wrapper, removed):
+        """Drop finished trades the order store has already let go of"""
+        store = self.handler.orders
+        dropped = [key for key, trade in wrapper.trades.items()
+                   if trade.isDone() and trade.order.orderId not in store.orders]
+        for key in dropped:
+            trade = wrapper.trades.pop(key)
+            perm_id = trade.order.permId
+            if perm_id and wrapper.permId2Trade.get(perm_id) is trade:
+                del wrapper.permId2Trade[perm_id]
+        removed['trades_dropped'] += len(dropped)
+
+    def _sweep_fills(self, wrapper, removed):
+        cutoff = time_lib.time() - self.fill_ttl
+        expired = dict.fromkeys(exec_id for exec_id, fill in wrapper.fills.items()
+                                if fill.time and fill.time.timestamp() < cutoff)
+        excess = len(wrapper.fills) - self.max_fills
+        for exec_id in wrapper.fills:  # Arrival order, oldest first
+            if len(expired) >= excess:
+                break
+            expired.setdefault(exec_id)
+
+        archived = [fill_record(wrapper.fills.pop(exec_id)) for exec_id in expired]
+        removed['fills_archived'] += len(archived)
+        return archived
+
+    def memory_usage(self):
+        """Entry counts for everything the handler and its brokers keep in memory"""
+        handler = self.handler
+        store = handler.orders
+        brokers = {}
+        for connection in handler.pool.connections:
+            wrapper = getattr(connection.client, 'wrapper', None)
+            if wrapper is not None:
+                brokers[connection.name] = {
+                    "trades": len(wrapper.trades),
+                    "permIds": len(wrapper.permId2Trade),
+                    "fills": len(wrapper.fills),
+                }
+        return {
+            "process": process_memory(),
+            "orderStore": {
+                "orders": len(store.orders),
+                "byPermId": len(store.by_perm),
+                "contracts": len(store.by_contract),
+                "transitions": sum(len(lifecycle.events) for lifecycle in store.orders.values()),
+            },
+            "openOrders": len(handler.open_orders),
+            "positions": len(handler.positions),
+            "brokers": brokers,
+            "marketDataLines": len(handler.market_data.lines),
+            "tickStore": {
+                "symbols": len(handler.tick_store.series),
+                "bytes": handler.tick_store.memory_bytes(),
+            },
+            "contractCache": len(handler.contract_cache.contracts),
+            "optionChainExpiries": len(handler.option_chain.strikes),
+        }
+
+    def status(self):
+        return {
+            "sweeps": self.sweeps,
+            "lastSweep": self.last_sweep,
+            "lastDurationMs": round(self.last_duration * 1000, 3),
+            "totals": self.totals,
+            "archived": self.archive.written if self.archive else None,
+            "limits": {
+                "orderTtl": self.order_ttl,
+                "closedOrderTtl": self.closed_order_ttl,
+                "maxOrders": self.max_orders,
+                "fillTtl": self.fill_ttl,
+                "maxFills": self.max_fills,
+            },
+        }
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.sleep(self.interval)
+                self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Error in retention sweep: {e}")
@@ -0,0 +1,192 @@
+import asyncio
+import itertools
+import json
+import math
+import time as time_lib
+import urllib.parse
+import urllib.request
+from collections import OrderedDict, deque
+from ..logging_config import get_logger
+from ..metrics import SIGNAL_QUEUE_WAIT, SIGNAL_DUPLICATES, SIGNAL_REJECTS
+
+log = get_logger('signals')
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Signal queue full")
+        self.retry_after = retry_after  # Seconds the caller should wait before retrying
+
+
+class SignalJob:
+    __slots__ = ('id', 'signal', 'symbol', 'status', 'result', 'callback_url', 'received_at',
+                 'received_time', 'started_at', 'finished_at', 'done')
+
+    def __init__(self, job_id, signal, received_at, callback_url=None):
+        self.id = job_id
+        self.signal = signal
+        self.symbol = str(signal.get('symbol', ''))
+        self.status = 'queued'
+        self.result = None
+        self.callback_url = callback_url
+        self.received_at = received_at  # perf_counter, so latency metrics include the queue wait
+        self.received_time = time_lib.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = asyncio.Event()
+
+    def to_dict(self):
+        return {
+            "jobId": self.id,
+            "status": self.status,
+            "signal": self.signal,
+            "result": self.result,
+            "receivedAt": self.received_time,
+            "queueWaitMs": round((self.started_at - self.received_at) * 1000, 3) if self.started_at else None,
+            "processMs": round((self.finished_at - self.started_at) * 1000, 3) if self.finished_at else None,
+        }
+
+
+class SignalQueue:
+    """Bounded, deduplicating queue between the webhook and order placement, serial per symbol"""
+
+    def __init__(self, process, max_queue=100, workers=4, dedup_ttl=10.0, dedup_size=1024, result_size=1000):
+        self.process = process  # async (signal, received_at) -> result dict
+        self.max_queue = max_queue
+        self.worker_count = workers
+        self.dedup_ttl = dedup_ttl
+        self.dedup_size = dedup_size
+        self.result_size = result_size
+        self.ready = None  # Symbols with jobs waiting and no worker on them; created in start()
+        self.workers = []
+        self.pending = {}  # symbol -> deque of queued jobs, removed once drained
+        self.queued = 0
+        self.recent = OrderedDict()  # dedup key -> (expires at, job id), oldest first
+        self.jobs = OrderedDict()  # job id -> SignalJob, oldest first
+        self.ids = itertools.count(1)
+        self.process_time = 0.0  # Moving average of seconds per signal, for Retry-After
+
+    def start(self):
+        if self.ready is None:
+            self.ready = asyncio.Queue()
+        self.workers = [asyncio.ensure_future(self.worker()) for _ in range(self.worker_count)]
+
+    def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        self.workers = []
+
+    @staticmethod
+    def dedup_key(signal, idempotency_key=None):
+        if idempotency_key:
+            return f"key:{idempotency_key}"
+        return json.dumps(signal, sort_keys=True, default=str)
+
+    @staticmethod
+    def valid_callback_url(url):
+        if not isinstance(url, str):
+            return False
+        parts = urllib.parse.urlparse(url)
+        return parts.scheme in ('http', 'https') and bool(parts.netloc)
+
+    def submit(self, signal, received_at, idempotency_key=None, callback_url=None):
+        """Queue signal; returns (job, duplicate), raises QueueFull or ValueError for a bad callback_url"""
+        if callback_url is not None and not self.valid_callback_url(callback_url):
+            raise ValueError("callback_url must be an http or https URL")
+        now = time_lib.monotonic()
+        key = self.dedup_key(signal, idempotency_key)
+        seen = self.recent.get(key)
+        if seen is not None and seen[0] > now and seen[1] in self.jobs:
+            SIGNAL_DUPLICATES.inc()
+            return self.jobs[seen[1]], True
+
+        if self.queued >= self.max_queue:
+            raise QueueFull(self.retry_after())
+
+        job = SignalJob(str(next(self.ids)), signal, received_at, callback_url)
+        jobs = self.pending.get(job.symbol)
+        if jobs is None:
+            # No worker holds this symbol, hand it to the next free one
+            jobs = self.pending[job.symbol] = deque()
+            self.ready.put_nowait(job.symbol)
+        jobs.append(job)
+        self.queued += 1
+        self.jobs[job.id] = job
+        while len(self.jobs) > self.result_size:
+            self.jobs.popitem(last=False)
+
+        self.recent[key] = (now + self.dedup_ttl, job.id)
+        self.recent.move_to_end(key)
+        while len(self.recent) > self.dedup_size:
+            self.recent.popitem(last=False)
+        return job, False
+
+    def retry_after(self):
+        """Seconds until the current backlog should have drained, at least 1"""
+        backlog = self.queued * self.process_time / max(1, self.worker_count)
+        return max(1, math.ceil(backlog))
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    async def worker(self):
+        while True:
+            symbol = await self.ready.get()
+            jobs = self.pending[symbol]
+            job = jobs.popleft()
+            self.queued -= 1
+            try:
+                await self.run_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Error in signal worker: {e}")
+            finally:
+                # The symbol goes back in line behind other symbols, or is forgotten once drained
+                if jobs:
+                    self.ready.put_nowait(symbol)
+                else:
+                    del self.pending[symbol]
+
+    async def run_job(self, job):
+        job.status = 'processing'
+        job.started_at = time_lib.perf_counter()
+        SIGNAL_QUEUE_WAIT.observe(job.started_at - job.received_at)
+        try:
+            job.result = await self.process(job.signal, job.received_at)
+        except Exception as e:
+            job.result = {"status": "error", "message": str(e)}
+        job.finished_at = time_lib.perf_counter()
+        job.status = 'done'
+        job.done.set()
+        if job.result.get("status") == "error":
+            SIGNAL_REJECTS.inc()
+        self.process_time = 0.8 * self.process_time + 0.2 * (job.finished_at - job.started_at)
+        if job.callback_url:
+            asyncio.ensure_future(self.deliver(job))
+
+    async def deliver(self, job):
+        """POST the finished job to the caller's callback URL"""
+        if not self.valid_callback_url(job.callback_url):
+            return
+        body = json.dumps(job.to_dict(), default=str).encode()
+        request = urllib.request.Request(job.callback_url, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, lambda: urllib.request.urlopen(request, timeout=5).close())
+        except Exception as e:
+            log.warning("Signal callback failed", extra={'fields': {
+                'jobId': job.id, 'url': job.callback_url, 'error': str(e)
+            }})
+
+    def status(self):
+        return {
+            "queued": self.queued,
+            "symbols": len(self.pending),
+            "maxQueue": self.max_queue,
+            "workers": self.worker_count,
+            "jobs": len(self.jobs),
+            "dedupEntries": len(self.recent),
+            "avgProcessMs": round(self.process_time * 1000, 3),
+        }
@@ -0,0 +1,390 @@
+import asyncio
+import math
+import random
+import zlib
+from datetime import date, datetime, timedelta, timezone
+
+from eventkit import Event
+from ib_insync import (
+    CommissionReport, ContractDetails, Execution, Fill, Future, Option, OptionChain,
+    OrderStatus, PnL, PortfolioItem, Position, Stock, Ticker, Trade, TradeLogEntry
+)
+
+
+class SimulatedWrapper:
+    """The order and fill history ib_insync keeps on IB.wrapper"""
+
+    def __init__(self):
+        self.trades = {}  # (clientId, orderId) -> Trade
+        self.permId2Trade = {}
+        self.fills = {}  # execId -> Fill
+
+
+class SimulatedIB:
+    """In-process stand-in for the parts of ib_insync.IB that IBHandler uses
+
+    Orders are acknowledged after ack_latency and filled after fill_latency at
+    the simulated price plus slippage. Positions, portfolio items and PnL are
+    updated from those fills, and a random-walk SPY price drives a tick stream
+    for every subscribed contract. Nothing touches the network.
+    """
+
+    SPY_CON_ID = 756733
+    ACCOUNT = 'DU0000000'
+
+    def __init__(self, spy_price=598.0, ack_latency=0.005, fill_latency=0.02, slippage=0.01,
+                 tick_interval=0.25, volatility=0.0002, seed=None):
+        self.ack_latency = ack_latency  # Seconds from placeOrder to Submitted
+        self.fill_latency = fill_latency  # Seconds from placeOrder to Filled
+        self.slippage = slippage  # Price units added to buys and taken from sells
+        self.tick_interval = tick_interval  # Seconds between synthetic ticks, 0 disables them
+        self.volatility = volatility  # Per-tick standard deviation of SPY returns
+        self.spy_price = spy_price
+        self.random = random.Random(seed)
+
+        self.connectedEvent = Event('connectedEvent')
+        self.disconnectedEvent = Event('disconnectedEvent')
+        self.openOrderEvent = Event('openOrderEvent')
+        self.orderStatusEvent = Event('orderStatusEvent')
+        self.execDetailsEvent = Event('execDetailsEvent')
+        self.positionEvent = Event('positionEvent')
+        self.updatePortfolioEvent = Event('updatePortfolioEvent')
+        self.pendingTickersEvent = Event('pendingTickersEvent')
+        self.pnlEvent = Event('pnlEvent')
+        self.errorEvent = Event('errorEvent')
+
+        self.client_id = None
+        self._connected = False
+        self._next_order_id = 1
+        self._next_exec_id = 1
+        self.wrapper = SimulatedWrapper()
+        self._positions = {}  # conId -> Position
+        self._realized = {}  # conId -> realized PnL
+        self._tickers = {}  # conId -> Ticker
+        self._pnl = None
+        self._tick_task = None
+        self._spy = Stock('SPY', 'SMART', 'USD', conId=self.SPY_CON_ID, primaryExchange='ARCA',
+                          localSymbol='SPY', tradingClass='SPY')
+
+    # Connection
+
+    async def connectAsync(self, host='127.0.0.1', port=7497, clientId=1, timeout=4, readonly=False, account=''):
+        await asyncio.sleep(0)
+        self.client_id = clientId
+        self._connected = True
+        if self.tick_interval and self._tick_task is None:
+            self._tick_task = asyncio.ensure_future(self._tick_loop())
+        self.connectedEvent.emit()
+        return self
+
+    def isConnected(self):
+        return self._connected
+
+    def disconnect(self):
+        if not self._connected:
+            return
+        self._connected = False
+        if self._tick_task:
+            self._tick_task.cancel()
+            self._tick_task = None
+        self.disconnectedEvent.emit()
+
+    def managedAccounts(self):
+        return [self.ACCOUNT]
+
+    def reqMarketDataType(self, marketDataType):
+        pass
+
+    async def reqCurrentTimeAsync(self):
+        return datetime.now(timezone.utc)
+
+    # Contracts
+
+    @staticmethod
+    def _con_id(*parts):
+        return zlib.crc32('|'.join(str(p) for p in parts).encode()) & 0x7fffffff
+
+    def _mes_contracts(self):
+        contracts = []
+        today = date.today()
+        year, month = today.year, today.month
+        while len(contracts) < 4:
+            if month in (3, 6, 9, 12):
+                first = date(year, month, 1)
+                expiry = first + timedelta(days=(4 - first.weekday()) % 7 + 14)  # Third Friday
+                if expiry >= today:
+                    code = 'HMUZ'[(month // 3) - 1]
+                    contracts.append(Future(
+                        'MES', expiry.strftime('%Y%m%d'), 'CME', currency='USD', multiplier='5',
+                        conId=self._con_id('MES', expiry), localSymbol=f"MES{code}{year % 10}",
+                        tradingClass='MES'
+                    ))
+            month += 1
+            if month > 12:
+                year, month = year + 1, 1
+        return contracts
+
+    def _option_expirations(self, count=10):
+        expirations = []
+        day = date.today()
+        while len(expirations) < count:
+            if day.weekday() < 5:
+                expirations.append(day.strftime('%Y%m%d'))
+            day += timedelta(days=1)
+        return expirations
+
+    def _option_strikes(self):
+        center = round(self.spy_price)
+        return [float(strike) for strike in range(center - 50, center + 51)]
+
+    def _make_option(self, expiry, strike, right):
+        strike = float(strike)
+        local = f"SPY   {expiry[2:]}{right}{int(round(strike * 1000)):08d}"
+        return Option(
+            'SPY', expiry, strike, right, 'SMART', multiplier='100', currency='USD',
+            conId=self._con_id('SPY', expiry, strike, right), localSymbol=local, tradingClass='SPY'
+        )
+
+    def _matching_contracts(self, contract):
+        if contract.secType == 'STK' and contract.symbol == 'SPY':
+            return [self._spy]
+        if contract.secType == 'FUT' and contract.symbol == 'MES':
+            expiry = contract.lastTradeDateOrContractMonth
+            return [c for c in self._mes_contracts() if not expiry or c.lastTradeDateOrContractMonth.startswith(expiry)]
+        if contract.secType == 'OPT' and contract.symbol == 'SPY':
+            expirations = [contract.lastTradeDateOrContractMonth] if contract.lastTradeDateOrContractMonth \
+                else self._option_expirations()
+            strikes = [float(contract.strike)] if contract.strike else self._option_strikes()
+            rights = [contract.right] if contract.right else ['C', 'P']
+            return [
+                self._make_option(expiry, strike, right)
+                for expiry in expirations if expiry in self._option_expirations()
+                for strike in strikes if strike in self._option_strikes()
+                for right in rights
+            ]
+        return []
+
+    async def reqContractDetailsAsync(self, contract):
+        await asyncio.sleep(0)
+        return [ContractDetails(contract=c, marketName=c.tradingClass, minTick=0.01)
+                for c in self._matching_contracts(contract)]
+
+    async def qualifyContractsAsync(self, *contracts):
+        await asyncio.sleep(0)
+        qualified = []
+        for contract in contracts:
+            matches = self._matching_contracts(contract)
+            if len(matches) == 1:
+                contract.update(**{k: v for k, v in vars(matches[0]).items() if v})
+                qualified.append(contract)
+        return qualified
+
+    async def reqSecDefOptParamsAsync(self, underlyingSymbol, futFopExchange, underlyingSecType, underlyingConId):
+        await asyncio.sleep(0)
+        return [OptionChain(
+            exchange='SMART', underlyingConId=underlyingConId, tradingClass='SPY', multiplier='100',
+            expirations=self._option_expirations(), strikes=self._option_strikes()
+        )]
+
+    # Prices and market data
+
+    def price_of(self, contract):
+        if contract.secType == 'STK':
+            return self.spy_price
+        if contract.secType == 'FUT':
+            return round(self.spy_price * 10 * 4) / 4  # MES tracks the index, ~10x SPY
+        intrinsic = max(0.0, self.spy_price - contract.strike) if contract.right == 'C' \
+            else max(0.0, contract.strike - self.spy_price)
+        time_value = 0.5 * math.exp(-abs(self.spy_price - contract.strike) / 5)
+        return round(intrinsic + time_value + 0.01, 2)
+
+    def reqMktData(self, contract, genericTickList='', snapshot=False, regulatorySnapshot=False,
+                   mktDataOptions=None):
+        ticker = self._tickers.get(contract.conId)
+        if ticker is None:
+            ticker = Ticker(contract=contract)
+            self._tickers[contract.conId] = ticker
+            self._update_ticker(ticker, datetime.now(timezone.utc))
+        return ticker
+
+    def cancelMktData(self, contract):
+        self._tickers.pop(contract.conId, None)
+
+    def _update_ticker(self, ticker, now):
+        price = self.price_of(ticker.contract)
+        spread = 0.01 if ticker.contract.secType != 'FUT' else 0.25
+        ticker.time = now
+        ticker.bid, ticker.ask = round(price - spread / 2, 2), round(price + spread / 2, 2)
+        ticker.bidSize = ticker.askSize = 100
+        ticker.last, ticker.lastSize = price, self.random.randint(1, 10) * 100
+        ticker.volume = (ticker.volume if ticker.volume == ticker.volume else 0) + ticker.lastSize
+        if ticker.close != ticker.close:  # NaN until the first tick
+            ticker.close = price
+
+    def step(self):
+        """Advance the random walk one tick and publish every subscribed ticker"""
+        self.spy_price = round(self.spy_price * math.exp(self.random.gauss(0, self.volatility)), 2)
+        now = datetime.now(timezone.utc)
+        for ticker in self._tickers.values():
+            self._update_ticker(ticker, now)
+        if self._tickers:
+            self.pendingTickersEvent.emit(set(self._tickers.values()))
+
+    async def _tick_loop(self):
+        portfolio_due = 0.0
+        loop = asyncio.get_event_loop()
+        while self._connected:
+            await asyncio.sleep(self.tick_interval)
+            self.step()
+            # IB sends portfolio updates far less often than ticks
+            if loop.time() >= portfolio_due:
+                portfolio_due = loop.time() + 1.0
+                self._publish_portfolio()
+
+    # Orders
+
+    def placeOrder(self, contract, order):
+        if not order.orderId:
+            order.orderId = self._next_order_id
+            self._next_order_id += 1
+        order.clientId = self.client_id or 0
+        order.permId = order.permId or self._con_id('perm', order.orderId, self.client_id)
+        status = OrderStatus(orderId=order.orderId, status='PendingSubmit', remaining=order.totalQuantity,
+                             permId=order.permId, clientId=order.clientId)
+        trade = Trade(contract, order, status, [], [TradeLogEntry(datetime.now(timezone.utc), 'PendingSubmit')])
+        self.wrapper.trades[(order.clientId, order.orderId)] = trade
+        self.wrapper.permId2Trade[order.permId] = trade
+
+        loop = asyncio.get_event_loop()
+        loop.call_later(self.ack_latency, self._set_status, trade, 'Submitted')
+        loop.call_later(max(self.fill_latency, self.ack_latency), self._fill, trade)
+        self.openOrderEvent.emit(trade)
+        return trade
+
+    def cancelOrder(self, order):
+        trade = self.wrapper.trades.get((order.clientId, order.orderId))
+        if trade is None or trade.isDone():
+            return None
+        self._set_status(trade, 'PendingCancel')
+        asyncio.get_event_loop().call_later(self.ack_latency, self._set_status, trade, 'Cancelled')
+        return trade
+
+    def _set_status(self, trade, status):
+        if trade.isDone():
+            return
+        trade.orderStatus.status = status
+        trade.log.append(TradeLogEntry(datetime.now(timezone.utc), status))
+        trade.statusEvent.emit(trade)
+        self.orderStatusEvent.emit(trade)
+        if status == 'Cancelled':
+            trade.cancelledEvent.emit(trade)
+
+    def _fill(self, trade):
+        if trade.isDone():
+            return
+        order, contract = trade.order, trade.contract
+        side = 1 if order.action == 'BUY' else -1
+        price = round(self.price_of(contract) + side * self.slippage, 2)
+        quantity = order.totalQuantity
+        now = datetime.now(timezone.utc)
+
+        execution = Execution(
+            execId=f"sim.{self._next_exec_id:08d}", time=now, acctNumber=self.ACCOUNT, exchange=contract.exchange,
+            side='BOT' if side > 0 else 'SLD', shares=quantity, price=price, permId=order.permId,
+            clientId=order.clientId, orderId=order.orderId, cumQty=quantity, avgPrice=price
+        )
+        self._next_exec_id += 1
+        fill = Fill(contract, execution, CommissionReport(execId=execution.execId), now)
+        trade.fills.append(fill)
+        self.wrapper.fills[execution.execId] = fill
+
+        trade.orderStatus.filled = quantity
+        trade.orderStatus.remaining = 0
+        trade.orderStatus.avgFillPrice = price
+        trade.orderStatus.lastFillPrice = price
+        self._apply_fill(contract, side * quantity, price)
+
+        self.execDetailsEvent.emit(trade, fill)
+        trade.fillEvent.emit(trade, fill)
+        self._set_status(trade, 'Filled')
+        trade.filledEvent.emit(trade)
+
+    @staticmethod
+    def _multiplier(contract):
+        return float(contract.multiplier or 1)
+
+    def _apply_fill(self, contract, quantity, price):
+        multiplier = self._multiplier(contract)
+        held = self._positions.get(contract.conId)
+        old_quantity = held.position if held else 0.0
+        old_cost = held.avgCost if held else 0.0
+        new_quantity = old_quantity + quantity
+
+        if old_quantity and (old_quantity > 0) != (quantity > 0):
+            # Reducing or flipping, realise PnL on the closed part
+            closed = min(abs(quantity), abs(old_quantity)) * (1 if old_quantity > 0 else -1)
+            realized = closed * (price * multiplier - old_cost)
+            self._realized[contract.conId] = self._realized.get(contract.conId, 0.0) + realized
+            avg_cost = old_cost if new_quantity and (new_quantity > 0) == (old_quantity > 0) else price * multiplier
+        elif new_quantity:
+            avg_cost = (old_quantity * old_cost + quantity * price * multiplier) / new_quantity
+        else:
+            avg_cost = 0.0
+
+        position = Position(self.ACCOUNT, contract, new_quantity, avg_cost if new_quantity else 0.0)
+        if new_quantity:
+            self._positions[contract.conId] = position
+        else:
+            self._positions.pop(contract.conId, None)
+        self.positionEvent.emit(position)
+        self.updatePortfolioEvent.emit(self._portfolio_item(position))
+        self._publish_pnl()
+
+    def _portfolio_item(self, position):
+        price = self.price_of(position.contract)
+        market_value = position.position * price * self._multiplier(position.contract)
+        return PortfolioItem(
+            position.contract, position.position, price, market_value, position.avgCost,
+            market_value - position.position * position.avgCost,
+            self._realized.get(position.contract.conId, 0.0), self.ACCOUNT
+        )
+
+    def _publish_portfolio(self):
+        for position in list(self._positions.values()):
+            self.updatePortfolioEvent.emit(self._portfolio_item(position))
+        self._publish_pnl()
+
+    # Account state
+
+    def positions(self, account=''):
+        return list(self._positions.values())
+
+    def portfolio(self, account=''):
+        return [self._portfolio_item(position) for position in self._positions.values()]
+
+    def trades(self):
+        return list(self.wrapper.trades.values())
+
+    def openTrades(self):
+        return [trade for trade in self.wrapper.trades.values() if not trade.isDone()]
+
+    def fills(self):
+        return list(self.wrapper.fills.values())
+
+    def reqPnL(self, account, modelCode=''):
+        self._pnl = PnL(account, modelCode, 0.0, 0.0, 0.0)
+        self._publish_pnl()
+        return self._pnl
+
+    def cancelPnL(self, account, modelCode=''):
+        self._pnl = None
+
+    def _publish_pnl(self):
+        if self._pnl is None:
+            return
+        unrealized = sum(item.unrealizedPNL for item in self.portfolio())
+        realized = sum(self._realized.values())
+        self._pnl.unrealizedPnL = unrealized
+        self._pnl.realizedPnL = realized
+        self._pnl.dailyPnL = unrealized + realized
+        self.pnlEvent.emit(self._pnl)
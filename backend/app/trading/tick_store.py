@@ -0,0 +1,149 @@
+import numpy as np
+
+TICK_FIELDS = ('ts', 'bid', 'ask', 'last', 'size')
+BAR_FIELDS = ('ts', 'open', 'high', 'low', 'close', 'volume')
+BAR_INTERVALS = {'1s': 1, '1m': 60, '5m': 300}
+
+
+class RingBuffer:
+    """Preallocated float64 rows; once full, each append overwrites the oldest row"""
+
+    def __init__(self, capacity, fields):
+        self.capacity = capacity
+        self.fields = fields
+        self.data = np.full((capacity, len(fields)), np.nan)
+        self.count = 0  # Rows ever written, the next write goes to count % capacity
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, row):
+        index = self.count % self.capacity
+        self.data[index] = row
+        self.count += 1
+        return index
+
+    def segments(self, limit=None):
+        """The newest `limit` rows, oldest first, as at most two views into the buffer"""
+        size = len(self)
+        n = size if limit is None else max(0, min(limit, size))
+        end = self.count % self.capacity
+        start = end - n
+        if start >= 0:
+            return [self.data[start:end]]
+        return [view for view in (self.data[start:], self.data[:end]) if len(view)]
+
+
+class BarBuilder:
+    """Folds ticks into OHLCV bars of one interval, updating the current bar in place"""
+
+    def __init__(self, interval, capacity):
+        self.interval = interval
+        self.bars = RingBuffer(capacity, BAR_FIELDS)
+        self.start = None
+        self.index = None
+        self.bar = None  # [open, high, low, close, volume] of the current bar
+
+    def update(self, ts, price, size):
+        start = ts - ts % self.interval
+        bar = self.bar
+        if bar is None or start > self.start:
+            self.start = start
+            self.bar = [price, price, price, price, size]
+            self.index = self.bars.append((start, price, price, price, price, size))
+            return
+        # Late ticks are folded into the current bar rather than rewriting history
+        if price > bar[1]:
+            bar[1] = price
+        if price < bar[2]:
+            bar[2] = price
+        bar[3] = price
+        bar[4] += size
+        self.bars.data[self.index] = (self.start, *bar)
+
+
+class SymbolSeries:
+    def __init__(self, tick_capacity, bar_capacity):
+        self.ticks = RingBuffer(tick_capacity, TICK_FIELDS)
+        self.bars = {name: BarBuilder(seconds, bar_capacity) for name, seconds in BAR_INTERVALS.items()}
+        self.volume = None  # Cumulative session volume at the previous ticker update
+        self.last = None  # Last trade price at the previous ticker update
+
+    def record(self, ts, bid, ask, last, size):
+        self.ticks.append((ts, bid, ask, last, size))
+        # Trade price when there is one, otherwise the quote midpoint
+        price = last if last == last and last > 0 else (bid + ask) / 2
+        if not price == price or price <= 0:
+            return
+        size = size if size == size else 0.0
+        for builder in self.bars.values():
+            builder.update(ts, price, size)
+
+
+class TickStore:
+    """Bounded per-symbol tick history with 1s/1m/5m bars built as ticks arrive
+
+    Memory is fixed per symbol: tick_capacity ticks plus bar_capacity bars per interval,
+    and a symbol's series is dropped when its market data line is closed.
+    Traded size is taken from the change in the ticker's cumulative volume, so it stays
+    exact even when updates are conflated; high and low only see the prices present
+    at each update, so conflated trades in between can be missed.
+    """
+
+    def __init__(self, tick_capacity=10000, bar_capacity=2000):
+        self.tick_capacity = tick_capacity
+        self.bar_capacity = bar_capacity
+        self.series = {}  # symbol -> SymbolSeries
+
+    def record(self, symbol, ts, bid, ask, last, size):
+        series = self.series.get(symbol)
+        if series is None:
+            series = self.series[symbol] = SymbolSeries(self.tick_capacity, self.bar_capacity)
+        series.record(ts, bid, ask, last, size)
+
+    @staticmethod
+    def symbol_of(contract):
+        return contract.localSymbol or contract.symbol
+
+    def remove(self, symbol):
+        self.series.pop(symbol, None)
+
+    def record_ticker(self, ticker):
+        if not ticker.time:
+            return  # No data received yet
+        symbol = self.symbol_of(ticker.contract)
+        series = self.series.get(symbol)
+        if series is None:
+            series = self.series[symbol] = SymbolSeries(self.tick_capacity, self.bar_capacity)
+        # lastSize still holds the previous trade on quote-only updates, so count only new volume
+        volume = ticker.volume
+        if volume == volume and volume >= 0:
+            size = volume - series.volume if series.volume is not None and volume > series.volume else 0.0
+            series.volume = volume
+        elif ticker.last == ticker.last and ticker.last != series.last:
+            # No volume on this feed; ticker.ticks is cleared on every packet, so use the last trade
+            size = ticker.lastSize
+        else:
+            size = 0.0
+        series.last = ticker.last
+        series.record(ticker.time.timestamp(), ticker.bid, ticker.ask, ticker.last, size)
+
+    def bars(self, symbol, interval='1m', limit=None):
+        """Newest bars for symbol as views into its ring buffer; None if never seen"""
+        series = self.series.get(symbol)
+        if series is None:
+            return None
+        return series.bars[interval].bars.segments(limit)
+
+    def ticks(self, symbol, limit=None):
+        series = self.series.get(symbol)
+        if series is None:
+            return None
+        return series.ticks.segments(limit)
+
+    def memory_bytes(self):
+        total = 0
+        for series in self.series.values():
+            total += series.ticks.data.nbytes
+            total += sum(builder.bars.data.nbytes for builder in series.bars.values())
+        return total
@@ -0,0 +1,229 @@
+"""Repeatable benchmarks for the trading backend against the simulated broker
+
+Run from the backend directory:
+
+    python -m benchmarks.run --output bench.json
+
+Every scenario runs in-process against SimulatedIB, so results only depend on
+this code and the machine. Results are written as JSON so runs from different
+releases can be diffed.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from ib_insync import Future, MarketOrder, Option, OrderStatus, Position, Trade
+from starlette.websockets import WebSocketState
+
+from app.models.settings import Settings
+from app.streaming.hub import BroadcastHub
+from app.streaming.notifier import ChangeNotifier
+from app.trading.ib_handler import IBHandler
+from app.trading.simulator import SimulatedIB
+
+
+def summarize(samples):
+    """Latency percentiles in milliseconds"""
+    ordered = sorted(samples)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p50_ms': percentile(50),
+        'p90_ms': percentile(90),
+        'p99_ms': percentile(99),
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+async def make_handler():
+    broker = SimulatedIB(ack_latency=0.0, fill_latency=0.0, tick_interval=0, seed=1)
+    handler = IBHandler(Settings(call_strike=None, put_strike=None), broker=broker)
+    await handler.connect()
+    # The simulator lists weekday expirations only, pin SPY signals to the first one
+    expiry = broker._option_expirations()[0]
+    handler.get_option_expiry = lambda: expiry
+    return handler, broker
+
+
+async def bench_process_signal(signals):
+    handler, broker = await make_handler()
+    results = {}
+    for name, signal in (
+        ('mes', {'symbol': 'MES1!', 'action': 'Buy'}),
+        ('spy_option', {'symbol': 'SPY', 'action': 'Buy'}),
+    ):
+        samples = []
+        started = time.perf_counter()
+        for _ in range(signals):
+            t0 = time.perf_counter()
+            result = await handler.process_signal(signal)
+            samples.append(time.perf_counter() - t0)
+            if result['status'] != 'success':
+                raise RuntimeError(f"Signal failed: {result}")
+        elapsed = time.perf_counter() - started
+        results[name] = dict(summarize(samples), throughput_per_s=signals / elapsed)
+        await asyncio.sleep(0.05)  # Let simulated fills drain between scenarios
+    await handler.disconnect()
+    return results
+
+
+def synthetic_trade(order_id, status='Submitted'):
+    contract = Option('SPY', '20260101', 600.0 + order_id % 50, 'C', 'SMART', conId=order_id % 100 + 1,
+                      localSymbol=f"SPY{order_id % 100}")
+    order = MarketOrder('BUY', 1)
+    order.orderId = order_id
+    return Trade(contract, order, OrderStatus(orderId=order_id, status=status, remaining=1))
+
+
+def bench_callbacks(events):
+    handler = IBHandler(Settings(), broker=SimulatedIB(tick_interval=0))
+    results = {}
+
+    trades = [synthetic_trade(i, 'Submitted' if i % 3 else 'Filled') for i in range(events)]
+    started = time.perf_counter()
+    for trade in trades:
+        handler.order_status_monitor(trade)
+    elapsed = time.perf_counter() - started
+    results['order_status_monitor'] = {'events': events, 'total_ms': elapsed * 1000,
+                                       'per_event_us': elapsed / events * 1e6}
+
+    positions = [
+        Position('DU0', Future('MES', '20261218', 'CME', conId=i % 200 + 1, localSymbol=f"MES{i % 200}"),
+                 (i % 5) - 2, 100.0)
+        for i in range(events)
+    ]
+    started = time.perf_counter()
+    for position in positions:
+        handler.position_monitor(position)
+    elapsed = time.perf_counter() - started
+    results['position_monitor'] = {'events': events, 'total_ms': elapsed * 1000,
+                                   'per_event_us': elapsed / events * 1e6}
+    return results
+
+
+def bench_resync(history_sizes, open_orders=20, repeat=20):
+    results = {}
+    for size in history_sizes:
+        broker = SimulatedIB(tick_interval=0)
+        trades = [synthetic_trade(i, 'Filled') for i in range(size)]
+        trades += [synthetic_trade(size + i) for i in range(open_orders)]
+        broker.wrapper.trades = {(0, trade.order.orderId): trade for trade in trades}
+        handler = IBHandler(Settings(), broker=broker)
+        samples = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            handler.reconciler.reconcile()
+            samples.append(time.perf_counter() - t0)
+        results[str(size)] = summarize(samples)
+    return results
+
+
+class BenchWebSocket:
+    """WebSocket stand-in that records when the last expected frame arrives"""
+
+    def __init__(self):
+        self.client_state = WebSocketState.CONNECTED
+        self.received = 0
+        self.expected = 0
+        self.done = asyncio.Event()
+
+    async def send_text(self, frame):
+        self.received += 1
+        if self.received >= self.expected:
+            self.done.set()
+
+    send_bytes = send_text
+
+
+async def bench_fanout(client_counts, frames=200):
+    handler = IBHandler(Settings(), broker=SimulatedIB(tick_interval=0))
+    for i in range(50):
+        handler.order_status_monitor(synthetic_trade(i))
+
+    async def build_snapshot():
+        return {
+            'positions': await handler.get_positions(),
+            'orders': await handler.get_orders(),
+            'pnl': await handler.get_pnl()
+        }
+
+    results = {}
+    for count in client_counts:
+        hub = BroadcastHub(build_snapshot, ChangeNotifier(debounce=0), max_queue=frames + 2)
+        sockets = [BenchWebSocket() for _ in range(count)]
+        for websocket in sockets:
+            hub.add(websocket)
+        await asyncio.sleep(0.01)  # Initial snapshots
+
+        samples = []
+        for i in range(frames):
+            for websocket in sockets:
+                websocket.expected = websocket.received + 1
+                websocket.done.clear()
+            # Change one order so every frame carries a real update
+            trade = synthetic_trade(0)
+            trade.orderStatus.filled = i
+            handler.order_status_monitor(trade)
+            t0 = time.perf_counter()
+            full, delta = await hub.refresh()
+            hub.publish_update(full, delta)
+            await asyncio.gather(*(websocket.done.wait() for websocket in sockets))
+            samples.append(time.perf_counter() - t0)
+
+        for websocket in sockets:
+            hub.remove(websocket)
+        results[str(count)] = summarize(samples)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True).strip()
+    except Exception:
+        return None
+
+
+async def run(args):
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+        },
+        'process_signal': await bench_process_signal(args.signals),
+        'callbacks': bench_callbacks(args.events),
+        'resync': bench_resync(args.history),
+        'fanout': await bench_fanout(args.clients),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='bench.json', help='Where to write the JSON results')
+    parser.add_argument('--signals', type=int, default=500, help='Signals per process_signal scenario')
+    parser.add_argument('--events', type=int, default=10000, help='Events per callback scenario')
+    parser.add_argument('--history', type=int, nargs='+', default=[100, 1000, 10000, 50000],
+                        help='Trade history sizes for the resync scenario')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 10, 100],
+                        help='Client counts for the fan-out scenario')
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps({k: v for k, v in results.items() if k != 'meta'}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,7 @@ BASE_URL = "http://localhost:8000"
 def send_signal(signal):
     try:
         print(f"\nSending signal: {signal}")
-        response = requests.post(f"{BASE_URL}/api/signal", json=signal)
+        response = requests.post(f"{BASE_URL}/api/signal", json=signal, params={"wait": 10})
         response.raise_for_status()
         result = response.json()
         print(f"Response: {result}")
@@ -0,0 +1,33 @@
+from datetime import date
+from types import SimpleNamespace
+
+from app.trading.contract_cache import ContractCache
+
+
+def future(expiry):
+    return SimpleNamespace(symbol='MES', lastTradeDateOrContractMonth=expiry, strike=0.0, right='',
+                           secType='FUT')
+
+
+def make_cache(roll_days=8):
+    cache = ContractCache(ib=None, roll_days=roll_days)
+    for expiry in ('20261218', '20270319'):
+        cache.put(future(expiry))
+    return cache
+
+
+def test_front_month_holds_until_roll_date():
+    cache = make_cache()
+    assert cache.front_month('MES', today=date(2026, 12, 9)).lastTradeDateOrContractMonth == '20261218'
+
+
+def test_front_month_rolls_on_roll_date():
+    cache = make_cache()
+    # Thursday eight days before the December expiry
+    assert cache.front_month('MES', today=date(2026, 12, 10)).lastTradeDateOrContractMonth == '20270319'
+
+
+def test_front_month_without_roll_window_trades_until_expiry_eve():
+    cache = make_cache(roll_days=0)
+    assert cache.front_month('MES', today=date(2026, 12, 17)).lastTradeDateOrContractMonth == '20261218'
+    assert cache.front_month('MES', today=date(2026, 12, 18)).lastTradeDateOrContractMonth == '20270319'
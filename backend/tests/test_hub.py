@@ -0,0 +1,31 @@
+import asyncio
+import json
+
+from app.streaming.hub import BroadcastHub, ClientChannel
+
+
+def snapshot(price):
+    return {"positions": [], "orders": [], "spy": {"price": price}}
+
+
+def test_heartbeat_does_not_evict_queued_delta():
+    async def scenario():
+        hub = BroadcastHub(build_snapshot=None, notifier=None, max_queue=4)
+        hub.tracker.apply(snapshot(0.0))
+        start = hub.tracker.seq  # The client's snapshot
+        channel = ClientChannel(websocket=None, max_queue=4, protocol=2)
+        hub.channels[object()] = channel
+
+        for price in (1.0, 2.0, 3.0, 4.0):
+            hub.publish_update({"type": "data"}, hub.tracker.apply(snapshot(price)))
+        assert channel.queue.full()
+        hub.publish({"type": "heartbeat", "seq": hub.tracker.seq})
+
+        frames = []
+        while not channel.queue.empty():
+            frames.append(json.loads(channel.queue.get_nowait()))
+        return start, frames
+
+    start, frames = asyncio.run(scenario())
+    assert [frame["type"] for frame in frames] == ["delta"] * 4
+    assert [frame["seq"] for frame in frames] == [start + 1, start + 2, start + 3, start + 4]